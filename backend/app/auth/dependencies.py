@@ -7,9 +7,12 @@
 依赖函数
 --------
 
+- **resolve_user**: 验证 JWT 令牌并获取对应用户
 - **get_current_user**: 从 JWT 令牌获取当前用户
 - **get_current_active_user**: 获取当前激活状态的用户
 - **get_current_admin_user**: 获取当前管理员用户
+- **owned_portfolio**: 生成"获取当前用户拥有的投资组合"的依赖函数
+- **invalidate_user**: 使缓存中的用户对象失效
 
 使用方式
 --------
@@ -24,79 +27,151 @@
 --------
 
 1. 客户端在请求头中携带 Authorization: Bearer <token>
-2. oauth2_scheme 提取令牌
-3. get_current_user 验证令牌并返回用户对象
-4. 可选的进一步验证（激活状态、管理员权限）
+2. get_current_user 使用请求的数据库会话验证令牌并获取用户
+3. 可选的进一步验证（激活状态、管理员权限）
+
+FastAPI 在同一请求内缓存依赖结果，多个依赖共同引用 get_current_user 时
+令牌只验证一次、用户只查询一次，且与端点共用 get_db 提供的同一个会话。
+
+用户缓存
+--------
+
+设置 USER_CACHE_TTL > 0 后，resolve_user 会按用户 ID 缓存用户对象，
+在有效期内跳过数据库查询。用户被更新或删除时需调用 invalidate_user。
 """
 
+from typing import Callable, Optional
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
+from app.config import get_settings
 from app.database import get_db
-from app.models import User
+from app.models import Portfolio, User
 from app.auth.utils import verify_token
+from app.crud import portfolio as portfolio_crud
 from app.schemas.user import TokenData
 
+# 获取应用配置
+settings = get_settings()
+
 # OAuth2 密码模式，指定令牌获取端点
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# 当前用户缓存（按用户 ID 索引）
+# 仅在事件循环中访问，单次读或写之间没有 await，因此无需额外加锁
+_user_cache: Optional[TTLCache] = (
+    TTLCache(maxsize=5000, ttl=settings.USER_CACHE_TTL)
+    if settings.USER_CACHE_TTL > 0
+    else None
+)
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db)
-) -> User:
-    """获取当前登录用户
+# 失效计数，每次 invalidate_user 加一
+# 缓存未命中时要 await 数据库查询，查询期间如果有用户被失效，
+# 查到的可能是修改前的旧数据，此时不写入缓存
+_invalidation_count = 0
 
-    从请求头的 JWT 令牌中解析用户身份，并从数据库获取用户对象。
+# 预构建的用户查询语句（模块加载时构建一次，调用时只绑定参数）
+_SEL_USER_BY_ID = select(User).where(User.id == bindparam("uid"))
 
-    工作流程
-    --------
 
-    1. 从请求头提取 Bearer 令牌
-    2. 验证并解码 JWT 令牌
-    3. 从令牌载荷中获取用户 ID
-    4. 查询数据库获取用户对象
+def invalidate_user(user_id: int) -> None:
+    """使缓存中的用户对象失效
+
+    在用户信息被修改或删除后调用，确保后续请求重新从数据库加载。
 
     Args:
-        token: JWT 访问令牌（由 oauth2_scheme 自动提取）
-        db: 数据库会话（依赖注入）
+        user_id: 用户 ID
+    """
+    global _invalidation_count
+    if _user_cache is not None:
+        _invalidation_count += 1
+        _user_cache.pop(user_id, None)
 
-    Returns:
-        User: 当前登录的用户对象
 
-    Raises:
-        HTTPException: 401 - 令牌无效或用户不存在
-    """
-    # 定义认证失败异常
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+async def resolve_user(token: str, db: AsyncSession) -> Optional[User]:
+    """根据 JWT 令牌解析用户
+
+    验证令牌并按载荷中的用户 ID 获取用户对象。
+
+    Args:
+        token: JWT 访问令牌
+        db: 数据库会话
 
+    Returns:
+        User: 令牌对应的用户对象，令牌无效或用户不存在时返回 None
+    """
     # 验证令牌
     payload = verify_token(token)
     if payload is None:
-        raise credentials_exception
+        return None
 
     # 从载荷中获取用户 ID
     user_id_str = payload.get("sub")
     if user_id_str is None:
-        raise credentials_exception
+        return None
 
     # 转换用户 ID 为整数
     try:
         user_id = int(user_id_str)
     except (ValueError, TypeError):
-        raise credentials_exception
+        return None
+
+    # 优先从缓存获取用户
+    if _user_cache is not None:
+        user = _user_cache.get(user_id)
+        if user is not None:
+            return user
 
     # 从数据库查询用户
-    result = await db.execute(select(User).where(User.id == user_id))
+    # 查询前记录失效计数，查询期间发生过失效时结果可能已过期，不写入缓存
+    invalidation_count = _invalidation_count
+    result = await db.execute(_SEL_USER_BY_ID, {"uid": user_id})
     user = result.scalar_one_or_none()
 
+    if (
+        user is not None
+        and _user_cache is not None
+        and invalidation_count == _invalidation_count
+    ):
+        _user_cache[user_id] = user
+
+    return user
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """获取当前登录用户
+
+    从请求头的 JWT 令牌中解析用户身份，并返回用户对象。
+    不预加载 portfolios 等关联数据。
+
+    工作流程
+    --------
+
+    1. oauth2_scheme 确认请求携带 Bearer 令牌（缺失时返回 401）
+    2. 使用端点同一个数据库会话调用 resolve_user 验证令牌并获取用户
+
+    Args:
+        token: JWT 访问令牌（由 oauth2_scheme 自动提取）
+        db: 数据库会话（依赖注入）
+
+    Returns:
+        User: 当前登录的用户对象
+
+    Raises:
+        HTTPException: 401 - 令牌无效或用户不存在
+    """
+    user = await resolve_user(token, db)
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
     return user
 
@@ -145,3 +220,50 @@ async def get_current_admin_user(
             detail="Not enough permissions"
         )
     return current_user
+
+
+def owned_portfolio(action: str = "access") -> Callable:
+    """生成获取当前用户投资组合的依赖函数
+
+    依赖函数从路径参数 portfolio_id 加载投资组合并验证所有权，
+    端点直接接收已验证的 Portfolio 对象。FastAPI 在同一请求内会缓存依赖结果，
+    同一依赖被多次引用时只查询一次。
+
+    Args:
+        action: 403 错误信息中的操作名称（access / modify / delete）
+
+    Returns:
+        Callable: 依赖函数，返回当前用户拥有的投资组合
+
+    Example:
+        >>> @router.get("/{portfolio_id}")
+        ... async def get_portfolio(portfolio: Portfolio = Depends(owned_portfolio())):
+        ...     return portfolio
+    """
+    detail = f"Not authorized to {action} this portfolio"
+
+    async def get_owned_portfolio(
+        portfolio_id: int,
+        current_user: User = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_db)
+    ) -> Portfolio:
+        """加载投资组合并验证当前用户是否为所有者
+
+        Raises:
+            HTTPException: 404 - 投资组合不存在
+            HTTPException: 403 - 用户无权操作该投资组合
+        """
+        portfolio = await portfolio_crud.get_portfolio_by_id(db, portfolio_id=portfolio_id)
+        if not portfolio:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Portfolio not found"
+            )
+        if portfolio.user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=detail
+            )
+        return portfolio
+
+    return get_owned_portfolio
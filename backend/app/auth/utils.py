@@ -6,7 +6,8 @@
 核心功能
 --------
 
-- **密码处理**: 使用 bcrypt 算法进行密码哈希和验证
+- **密码处理**: 使用 bcrypt（可选 Argon2）算法进行密码哈希和验证
+- **异步封装**: averify_password / aget_password_hash 在线程池中执行哈希计算
 - **JWT 令牌**: 创建和验证 JSON Web Token
 
 安全说明
@@ -15,20 +16,77 @@
 - 密码使用 bcrypt 算法哈希，具有自动加盐功能
 - JWT 使用 HS256 算法签名
 - 令牌包含过期时间，默认 30 分钟
+- 验证成功的令牌载荷会短时缓存，避免重复的签名校验与 JSON 解析
 """
 
-from datetime import datetime, timedelta
+import asyncio
+import base64
+import bcrypt
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from datetime import timedelta
 from typing import Optional
-from jose import JWTError, jwt
+from cachetools import TTLCache
+import jwt
+import orjson
 from passlib.context import CryptContext
 from app.config import get_settings
 
 # 获取应用配置
 settings = get_settings()
 
+# 令牌相关配置在导入时绑定为模块常量
+# 配置在进程生命周期内不变，热路径上不再重复读取 settings 属性或编码密钥
+_SECRET_KEY = settings.SECRET_KEY
+_SECRET_KEY_BYTES = _SECRET_KEY.encode()
+_ALG = settings.ALGORITHM
+_EXP = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+
+# 默认令牌有效期（启动时计算一次）
+_DEFAULT_EXPIRE_DELTA = timedelta(minutes=_EXP)
+_DEFAULT_EXPIRE_SECONDS = _DEFAULT_EXPIRE_DELTA.total_seconds()
+
+# 令牌验证结果缓存
+# - 键为令牌的 SHA-256 摘要，避免在内存中保存原始令牌
+# - ttl=5: 缓存时间很短，同时命中时还会再次检查 exp，过期令牌不会被返回
+# - maxsize=10000: 限制缓存条目数量，防止内存无限增长
+_token_cache: TTLCache = TTLCache(maxsize=10000, ttl=5)
+_token_cache_lock = threading.Lock()
+
+# HMAC 类 JWT 算法对应的摘要函数
+# 这些算法的令牌由 _decode_hmac_token 直接验证，hashlib 底层使用 OpenSSL，
+# 在支持的 CPU 上会自动启用 SHA-NI / ARMv8 SHA 指令
+_HMAC_DIGESTS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
+# 当前配置算法对应的摘要函数，非 HMAC 算法时为 None
+_HMAC_DIGEST = _HMAC_DIGESTS.get(_ALG)
+
+# 是否使用 Argon2 生成新密码哈希
+_use_argon2 = settings.PASSWORD_HASH_SCHEME == "argon2"
+
+# bcrypt 哈希前缀（$2a$ / $2b$ / $2y$），这类哈希直接交给 bcrypt 库处理
+_BCRYPT_PREFIX = "$2"
+
 # 密码哈希上下文
-# 使用 bcrypt 算法，deprecated="auto" 会自动处理旧算法迁移
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt 哈希直接调用 bcrypt 库，跳过 passlib 的算法分派和格式解析；
+# passlib 仅用于 Argon2 哈希的生成与验证
+# - 列表中第一个算法用于生成新哈希，其余算法仅用于验证已有哈希
+# - PASSWORD_HASH_SCHEME=argon2 时新密码使用 Argon2id，旧的 bcrypt 哈希仍可验证
+# - deprecated="auto": 非首选算法的哈希会被标记为需要升级
+_pwd_schemes = ["argon2", "bcrypt"] if _use_argon2 else ["bcrypt"]
+pwd_context = CryptContext(
+    schemes=_pwd_schemes,
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__ident="2b",
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -42,22 +100,67 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
     Returns:
         bool: 密码匹配返回 True，否则返回 False
+
+    Note:
+        bcrypt 哈希（包括旧的 $2a$ 格式）直接由 bcrypt.checkpw 验证，
+        其他格式（Argon2）交给 passlib 处理。
     """
+    if hashed_password.startswith(_BCRYPT_PREFIX):
+        return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
     return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """生成密码哈希
 
-    使用 bcrypt 算法对密码进行哈希处理。
+    使用配置的首选算法（默认 bcrypt）对密码进行哈希处理。
 
     Args:
         password: 明文密码
 
     Returns:
-        str: bcrypt 哈希后的密码字符串
+        str: 哈希后的密码字符串
     """
-    return pwd_context.hash(password)
+    if _use_argon2:
+        return pwd_context.hash(password)
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode(), salt).decode()
+
+
+# 用户不存在时参与验证的占位哈希
+# 与真实哈希使用相同算法和成本参数，登录失败时无论用户是否存在都执行一次哈希验证，
+# 响应时间不会泄露用户名是否存在
+DUMMY_PASSWORD_HASH = get_password_hash(secrets.token_urlsafe(16))
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """异步验证密码
+
+    bcrypt 验证是 CPU 密集型操作，在线程池中执行以免阻塞事件循环。
+    bcrypt 计算期间会释放 GIL，多个登录请求可以并行利用多核。
+
+    Args:
+        plain_password: 用户输入的明文密码
+        hashed_password: 数据库中存储的哈希密码
+
+    Returns:
+        bool: 密码匹配返回 True，否则返回 False
+    """
+    return await asyncio.to_thread(verify_password, plain_password, hashed_password)
+
+
+async def aget_password_hash(password: str) -> str:
+    """异步生成密码哈希
+
+    与 get_password_hash 相同，但在线程池中执行，不阻塞事件循环。
+
+    Args:
+        password: 明文密码
+
+    Returns:
+        str: 哈希后的密码字符串
+    """
+    return await asyncio.to_thread(get_password_hash, password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -79,17 +182,93 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode = data.copy()
     
     # 设置过期时间
+    # JWT 规范（RFC 7519）要求 exp 为 Unix 时间戳，直接基于 time.time() 计算，无需构造 datetime
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire_seconds = expires_delta.total_seconds()
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire_seconds = _DEFAULT_EXPIRE_SECONDS
+    to_encode["exp"] = int(time.time() + expire_seconds)
 
-    # 添加过期时间到载荷
-    to_encode.update({"exp": expire})
-    
     # 使用密钥和算法编码 JWT
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    # HMAC 算法直接用 orjson + hmac 生成，其他算法交给 PyJWT
+    if _HMAC_DIGEST is not None:
+        return _encode_hmac_token(to_encode, _HMAC_DIGEST)
+    return jwt.encode(to_encode, _SECRET_KEY, algorithm=_ALG)
+
+
+def _b64url_encode(data: bytes) -> bytes:
+    """编码为 JWT 使用的无填充 base64url 字节串"""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64url_decode(segment: str) -> bytes:
+    """解码 JWT 使用的无填充 base64url 字符串"""
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+# HMAC 令牌的头部段（配置固定，启动时编码一次）
+_HMAC_HEADER_SEGMENT = _b64url_encode(orjson.dumps({"alg": _ALG, "typ": "JWT"}))
+
+
+def _encode_hmac_token(payload: dict, digest) -> str:
+    """直接生成 HMAC 签名的 JWT 令牌
+
+    使用 orjson 序列化载荷并用 hmac 签名，与 _decode_hmac_token 对应。
+
+    Args:
+        payload: 令牌载荷，时间字段需为 Unix 时间戳
+        digest: 签名使用的 hashlib 摘要函数
+
+    Returns:
+        str: 编码后的 JWT 令牌字符串
+    """
+    signing_input = _HMAC_HEADER_SEGMENT + b"." + _b64url_encode(orjson.dumps(payload))
+    signature = hmac.new(_SECRET_KEY_BYTES, signing_input, digest).digest()
+    return (signing_input + b"." + _b64url_encode(signature)).decode()
+
+
+def _decode_hmac_token(token: str, digest) -> Optional[dict]:
+    """直接验证 HMAC 签名的 JWT 令牌
+
+    手动拆分 header.payload.signature，用 hmac 重新计算签名并进行常量时间比较，
+    再用 orjson 解析载荷，绕过 JWT 库中纯 Python 的分派和解析逻辑。
+
+    Args:
+        token: JWT 令牌字符串
+        digest: 签名使用的 hashlib 摘要函数
+
+    Returns:
+        dict: 解码后的令牌载荷，如果签名、算法或有效期校验失败返回 None
+    """
+    signing_input, _, signature_segment = token.rpartition(".")
+    header_segment, _, payload_segment = signing_input.partition(".")
+    if not header_segment or not payload_segment or "." in payload_segment:
+        return None
+
+    # 验证签名
+    expected = hmac.new(_SECRET_KEY_BYTES, signing_input.encode(), digest).digest()
+    if not hmac.compare_digest(expected, _b64url_decode(signature_segment)):
+        return None
+
+    # 头部声明的算法必须与配置一致，防止算法混淆
+    header = orjson.loads(_b64url_decode(header_segment))
+    if not isinstance(header, dict) or header.get("alg") != _ALG:
+        return None
+
+    payload = orjson.loads(_b64url_decode(payload_segment))
+    if not isinstance(payload, dict):
+        return None
+
+    # 检查有效期（exp）和生效时间（nbf）
+    now = time.time()
+    exp = payload.get("exp")
+    if exp is not None and (not isinstance(exp, (int, float)) or exp <= now):
+        return None
+    nbf = payload.get("nbf")
+    if nbf is not None and (not isinstance(nbf, (int, float)) or nbf > now):
+        return None
+
+    return payload
 
 
 def verify_token(token: str) -> Optional[dict]:
@@ -105,12 +284,34 @@ def verify_token(token: str) -> Optional[dict]:
 
     Note:
         验证失败的情况包括：签名无效、令牌过期、格式错误等。
+        只有验证成功的载荷才会被缓存，无效令牌每次都会重新校验并被拒绝。
     """
+    key = hashlib.sha256(token.encode()).digest()
+
+    # 优先读取缓存，命中时仍需确认令牌未过期
+    with _token_cache_lock:
+        payload = _token_cache.get(key)
+    if payload is not None and payload.get("exp", 0) > time.time():
+        return payload
+
     try:
         # 解码并验证令牌
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        # HMAC 算法走直接验证路径，其他算法交给 PyJWT
+        if _HMAC_DIGEST is not None:
+            payload = _decode_hmac_token(token, _HMAC_DIGEST)
+            if payload is None:
+                return None
+        else:
+            payload = jwt.decode(
+                token,
+                _SECRET_KEY,
+                algorithms=[_ALG],
+                options={"verify_aud": False},
+            )
+        with _token_cache_lock:
+            _token_cache[key] = payload
         return payload
-    except JWTError:
+    except jwt.PyJWTError:
         # JWT 相关错误（签名无效、过期等）
         return None
     except Exception:
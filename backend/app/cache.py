@@ -0,0 +1,148 @@
+"""
+列表查询缓存模块
+
+本模块为高频轮询的列表接口（投资组合列表、交易列表）提供进程内的
+查询结果缓存（保存编码后的 JSON 响应体），按命名空间组织，
+数据变更时按命名空间整体失效。
+
+命名空间
+--------
+
+- **portfolios:{user_id}**: 用户的投资组合列表
+- **trades:{portfolio_id}**: 投资组合的交易列表
+
+缓存键由命名空间、版本号和查询参数组成。失效操作为命名空间分配一个新的
+版本号，旧版本的条目不会再被命中，随后由 TTL 自然淘汰。
+
+调用方在查询数据库之前读取版本号，写入时沿用这个版本号：查询期间如果
+命名空间已失效，set_cached 会丢弃这次结果，不会把旧数据存到新版本下。
+
+使用方式
+--------
+
+::
+
+    from app import cache
+
+    namespace = f"portfolios:{user_id}"
+    version = cache.current_version(namespace)
+    body = cache.get_cached(namespace, version, (limit, after_id))
+    if body is cache.MISS:
+        body = ...  # 查询并编码为 JSON 响应体
+        cache.set_cached(namespace, version, (limit, after_id), body)
+
+    # 数据变更后
+    cache.invalidate(namespace)
+
+注意事项
+--------
+
+- 设置 RESPONSE_CACHE_TTL > 0 后启用，默认禁用
+- 缓存位于进程内，多 worker 部署时其他进程中的条目最多滞后 TTL 秒
+- 仅在事件循环中访问，单次读或写之间没有 await，因此无需加锁
+"""
+
+import itertools
+from typing import Any, Hashable, Optional
+from cachetools import TTLCache
+from app.config import get_settings
+
+# 获取应用配置
+settings = get_settings()
+
+# 未命中缓存时的返回值（与缓存的空列表等值区分）
+MISS = object()
+
+# 查询结果缓存，键为 (命名空间, 版本号, 查询参数)
+_cache: Optional[TTLCache] = (
+    TTLCache(maxsize=10000, ttl=settings.RESPONSE_CACHE_TTL)
+    if settings.RESPONSE_CACHE_TTL > 0
+    else None
+)
+
+# 版本号生成器，所有命名空间共用，分配出的版本号全局递增、不会重复
+_version_counter = itertools.count(1)
+
+# 没有版本记录的命名空间使用的版本号
+# 版本记录因容量不足被淘汰时提升到被淘汰的版本号，该命名空间随后读到的
+# 仍是淘汰前的版本，不会退回到更早的版本而命中旧条目
+_base_version = 0
+
+
+class _VersionCache(TTLCache):
+    """命名空间版本号缓存
+
+    版本记录与查询结果使用相同的 TTL：命名空间超过 TTL 没有再失效时，
+    旧版本的条目也已全部过期，版本记录可以安全丢弃，_versions 不会无限增长。
+    """
+
+    def popitem(self):
+        global _base_version
+        namespace, evicted = super().popitem()
+        _base_version = max(_base_version, evicted)
+        return namespace, evicted
+
+
+# 各命名空间的当前版本号（只有失效过的命名空间才有记录）
+_versions: Optional[_VersionCache] = (
+    _VersionCache(maxsize=10000, ttl=settings.RESPONSE_CACHE_TTL)
+    if _cache is not None
+    else None
+)
+
+
+def current_version(namespace: str) -> int:
+    """读取命名空间的当前版本号
+
+    在查询数据库之前调用，并将结果传给 get_cached / set_cached。
+
+    Args:
+        namespace: 命名空间
+
+    Returns:
+        int: 当前版本号，缓存未启用时返回 0
+    """
+    if _versions is None:
+        return 0
+    return _versions.get(namespace, _base_version)
+
+
+def get_cached(namespace: str, version: int, key: Hashable) -> Any:
+    """读取缓存
+
+    Args:
+        namespace: 命名空间
+        version: 查询前由 current_version() 读取的版本号
+        key: 查询参数组成的键
+
+    Returns:
+        缓存的查询结果，未命中或缓存未启用时返回 MISS
+    """
+    if _cache is None:
+        return MISS
+    return _cache.get((namespace, version, key), MISS)
+
+
+def set_cached(namespace: str, version: int, key: Hashable, value: Any) -> None:
+    """写入缓存
+
+    命名空间在读取 version 之后已失效时不写入，查询结果可能早于这次变更。
+
+    Args:
+        namespace: 命名空间
+        version: 查询前由 current_version() 读取的版本号
+        key: 查询参数组成的键
+        value: 查询结果
+    """
+    if _cache is not None and version == current_version(namespace):
+        _cache[(namespace, version, key)] = value
+
+
+def invalidate(namespace: str) -> None:
+    """使命名空间下的所有缓存条目失效
+
+    Args:
+        namespace: 命名空间
+    """
+    if _versions is not None:
+        _versions[namespace] = next(_version_counter)
@@ -11,6 +11,12 @@
 - **ALGORITHM**: JWT 加密算法，默认 HS256
 - **ACCESS_TOKEN_EXPIRE_MINUTES**: 令牌过期时间（分钟）
 - **DATABASE_URL**: 数据库连接字符串
+- **DEBUG**: 调试模式，开启后打印 SQL 语句
+- **DB_POOL_SIZE / DB_MAX_OVERFLOW**: 数据库连接池大小与溢出上限
+- **USER_CACHE_TTL**: 当前用户缓存时间（秒），0 表示禁用
+- **RESPONSE_CACHE_TTL**: 列表接口结果缓存时间（秒），0 表示禁用
+- **BCRYPT_ROUNDS**: bcrypt 哈希成本因子，默认 12
+- **PASSWORD_HASH_SCHEME**: 新密码的哈希算法（bcrypt 或 argon2）
 
 使用方式
 --------
@@ -43,11 +49,27 @@ class Settings(BaseSettings):
         ALGORITHM: JWT 加密算法
         ACCESS_TOKEN_EXPIRE_MINUTES: 访问令牌过期时间（分钟）
         DATABASE_URL: 数据库连接 URL
+        DEBUG: 调试模式，开启后 SQLAlchemy 会打印所有 SQL 语句
+        DB_POOL_SIZE: 连接池常驻连接数（SQLite 不使用）
+        DB_MAX_OVERFLOW: 连接池允许临时超出的连接数（SQLite 不使用）
+        DB_POOL_RECYCLE: 连接最长复用时间（秒），超时后重建连接
+        USER_CACHE_TTL: 认证用户对象的缓存时间（秒），默认 0 即不缓存
+        RESPONSE_CACHE_TTL: 投资组合/交易列表查询结果的缓存时间（秒），默认 0 即不缓存
+        BCRYPT_ROUNDS: bcrypt 成本因子，每增加 1 哈希耗时翻倍
+        PASSWORD_HASH_SCHEME: 新密码使用的哈希算法，argon2 需安装 argon2-cffi
     """
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     DATABASE_URL: str
+    DEBUG: bool = False
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 3600
+    USER_CACHE_TTL: int = 0
+    RESPONSE_CACHE_TTL: int = 0
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_SCHEME: str = "bcrypt"
 
     class Config:
         """Pydantic 配置"""
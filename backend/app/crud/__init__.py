@@ -10,6 +10,8 @@
 - **user**: 用户数据操作
 - **portfolio**: 投资组合数据操作
 - **trade**: 交易记录数据操作
+- **has_changes**: 判断更新数据是否会修改已加载的对象
+- **fresh_returning**: 让 UPDATE ... RETURNING 的结果覆盖会话中已加载的对象
 
 设计原则
 --------
@@ -32,3 +34,43 @@
     # 创建用户
     new_user = await user_crud.create_user(db, user=user_data)
 """
+
+from pydantic import BaseModel
+from sqlalchemy import select
+
+
+def has_changes(obj, update: BaseModel) -> bool:
+    """判断部分更新是否会修改已加载的 ORM 对象
+
+    只检查客户端实际提供的字段（model_fields_set）。空的 PATCH 请求，
+    或所有字段都与当前值相同的请求返回 False，调用方可以跳过 UPDATE 直接返回原对象。
+
+    Args:
+        obj: 已从数据库加载的 ORM 对象
+        update: 部分更新的请求模式
+
+    Returns:
+        bool: 至少有一个提供的字段与当前值不同时返回 True
+    """
+    for field in update.model_fields_set:
+        if getattr(obj, field) != getattr(update, field):
+            return True
+    return False
+
+
+def fresh_returning(model, stmt):
+    """包装 UPDATE ... RETURNING 语句，使返回的行覆盖会话中已加载的同一对象
+
+    路由在更新前通常已加载过该对象（所有权校验），直接执行 ORM 的
+    update().returning() 会返回身份映射中的旧实例，数据库端生成的列
+    （如 onupdate 的 updated_at）不会写回。通过 from_statement 执行并开启
+    populate_existing，RETURNING 的结果会刷新该实例的全部列。
+
+    Args:
+        model: ORM 模型类
+        stmt: 以 .returning(model) 结尾的 UPDATE 语句
+
+    Returns:
+        Select: 可直接交给 db.execute 执行的语句
+    """
+    return select(model).from_statement(stmt).execution_options(populate_existing=True)
@@ -8,6 +8,7 @@
 --------
 
 - get_portfolio_by_id: 根据 ID 查询投资组合
+- get_portfolio_owner_id: 查询投资组合所有者 ID
 - get_user_portfolios: 获取用户的所有投资组合
 - create_portfolio: 创建新投资组合
 - update_portfolio: 更新投资组合信息
@@ -21,11 +22,16 @@
 """
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models import Portfolio
+from sqlalchemy import select, insert, update, delete, bindparam
+from app.crud import fresh_returning
+from app.models import Portfolio, Trade
 from app.schemas.portfolio import PortfolioCreate, PortfolioUpdate
 from typing import Optional, List
 
+# 预构建的查询语句（模块加载时构建一次，调用时只绑定参数）
+_SEL_PORTFOLIO_BY_ID = select(Portfolio).where(Portfolio.id == bindparam("pid"))
+_SEL_PORTFOLIO_OWNER = select(Portfolio.user_id).where(Portfolio.id == bindparam("pid"))
+
 
 async def get_portfolio_by_id(db: AsyncSession, portfolio_id: int) -> Optional[Portfolio]:
     """根据 ID 查询投资组合
@@ -37,21 +43,57 @@ async def get_portfolio_by_id(db: AsyncSession, portfolio_id: int) -> Optional[P
     Returns:
         Portfolio: 投资组合对象，如果不存在返回 None
     """
-    result = await db.execute(select(Portfolio).where(Portfolio.id == portfolio_id))
+    result = await db.execute(_SEL_PORTFOLIO_BY_ID, {"pid": portfolio_id})
     return result.scalar_one_or_none()
 
 
-async def get_user_portfolios(db: AsyncSession, user_id: int) -> List[Portfolio]:
+async def get_portfolio_owner_id(db: AsyncSession, portfolio_id: int) -> Optional[int]:
+    """查询投资组合所有者的用户 ID
+
+    只查询 user_id 一列，不构造 ORM 对象，用于所有权校验。
+
+    Args:
+        db: 数据库会话
+        portfolio_id: 投资组合 ID
+
+    Returns:
+        int: 所有者用户 ID，如果投资组合不存在返回 None
+    """
+    result = await db.execute(_SEL_PORTFOLIO_OWNER, {"pid": portfolio_id})
+    return result.scalar_one_or_none()
+
+
+async def get_user_portfolios(
+    db: AsyncSession,
+    user_id: int,
+    *,
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None
+) -> List[Portfolio]:
     """获取用户的所有投资组合
 
+    结果按 ID 升序排列，支持基于 ID 的游标分页。
+
     Args:
         db: 数据库会话
         user_id: 用户 ID
+        limit: 返回的最大记录数（可选，默认返回全部）
+        after_id: 分页游标，仅返回 ID 大于该值的投资组合（可选）
 
     Returns:
         List[Portfolio]: 投资组合列表
     """
-    result = await db.execute(select(Portfolio).where(Portfolio.user_id == user_id))
+    query = select(Portfolio).where(Portfolio.user_id == user_id)
+
+    # 游标分页：从上一页最后一条记录之后继续
+    if after_id is not None:
+        query = query.where(Portfolio.id > after_id)
+
+    query = query.order_by(Portfolio.id)
+    if limit is not None:
+        query = query.limit(limit)
+
+    result = await db.execute(query)
     return list(result.scalars().all())
 
 
@@ -65,14 +107,17 @@ async def create_portfolio(db: AsyncSession, portfolio: PortfolioCreate, user_id
 
     Returns:
         Portfolio: 创建的投资组合对象
+
+    Note:
+        使用 INSERT ... RETURNING 一次取回自增 ID 和数据库默认值，无需 refresh。
     """
-    db_portfolio = Portfolio(
+    stmt = insert(Portfolio).values(
         **portfolio.model_dump(),
         user_id=user_id
-    )
-    db.add(db_portfolio)
+    ).returning(Portfolio)
+    result = await db.execute(stmt)
+    db_portfolio = result.scalar_one()
     await db.commit()
-    await db.refresh(db_portfolio)
     return db_portfolio
 
 
@@ -92,20 +137,24 @@ async def update_portfolio(
 
     Returns:
         Portfolio: 更新后的投资组合对象，如果不存在返回 None
-    """
-    result = await db.execute(select(Portfolio).where(Portfolio.id == portfolio_id))
-    db_portfolio = result.scalar_one_or_none()
-
-    if db_portfolio is None:
-        return None
 
+    Note:
+        使用单条 UPDATE ... RETURNING 语句完成更新并取回最新数据。
+    """
     # 只更新提供的字段
     update_data = portfolio_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_portfolio, field, value)
-
+    if not update_data:
+        return await get_portfolio_by_id(db, portfolio_id=portfolio_id)
+
+    stmt = fresh_returning(Portfolio, (
+        update(Portfolio)
+        .where(Portfolio.id == portfolio_id)
+        .values(**update_data)
+        .returning(Portfolio)
+    ))
+    result = await db.execute(stmt)
+    db_portfolio = result.scalar_one_or_none()
     await db.commit()
-    await db.refresh(db_portfolio)
     return db_portfolio
 
 
@@ -120,13 +169,15 @@ async def delete_portfolio(db: AsyncSession, portfolio_id: int) -> bool:
 
     Returns:
         bool: 删除成功返回 True，投资组合不存在返回 False
-    """
-    result = await db.execute(select(Portfolio).where(Portfolio.id == portfolio_id))
-    db_portfolio = result.scalar_one_or_none()
 
-    if db_portfolio is None:
-        return False
-
-    await db.delete(db_portfolio)
+    Note:
+        直接执行 DELETE 语句，不再将投资组合及其交易加载到会话中。
+    """
+    await db.execute(
+        delete(Trade)
+        .where(Trade.portfolio_id == portfolio_id)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(delete(Portfolio).where(Portfolio.id == portfolio_id))
     await db.commit()
-    return True
+    return result.rowcount > 0
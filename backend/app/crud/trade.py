@@ -7,12 +7,14 @@
 函数列表
 --------
 
-- calculate_profit_loss: 计算交易盈亏
 - get_trade_by_id: 根据 ID 查询交易
+- get_trade_with_owner_id: 查询交易及其投资组合所有者 ID
 - get_portfolio_trades: 获取投资组合的交易列表
+- list_trades_for_user_portfolio: 获取用户投资组合的交易列表（同时校验所有权）
 - create_trade: 创建新交易
 - update_trade: 更新交易信息
 - close_trade: 平仓交易
+- set_screenshot_path: 设置交易截图路径
 - delete_trade: 删除交易
 
 盈亏计算
@@ -21,44 +23,78 @@
 - 做多盈亏 = (出场价 - 入场价) × 数量
 - 做空盈亏 = (入场价 - 出场价) × 数量
 - 盈亏百分比 = 盈亏金额 / (入场价 × 数量) × 100
+
+其中 入场价 × 数量 由数据库生成列 pl_denominator 提供。
 """
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from app.models import Trade
-from app.models.trade import TradeStatus
+from sqlalchemy import select, and_, case, insert, update, delete, bindparam, tuple_
+from app.crud import fresh_returning
+from app.models import Portfolio, Trade
+from app.models.trade import TradeStatus, TradeType
 from app.schemas.trade import TradeCreate, TradeUpdate, TradeClose
-from typing import Optional, List
+from datetime import datetime
+from typing import Optional, List, Tuple
+
+# 预构建的查询语句（模块加载时构建一次，调用时只绑定参数）
+_SEL_TRADE_BY_ID = select(Trade).where(Trade.id == bindparam("tid"))
+_SEL_PORTFOLIO_OWNER = select(Portfolio.user_id).where(Portfolio.id == bindparam("pid"))
+_SEL_TRADE_WITH_OWNER = (
+    select(Trade, Portfolio.user_id)
+    .join(Portfolio, Trade.portfolio_id == Portfolio.id)
+    .where(Trade.id == bindparam("tid"))
+)
 
 
-def calculate_profit_loss(trade: Trade) -> tuple[float, float]:
-    """计算交易的盈亏金额和百分比
+def _profit_loss_values(update_data: dict) -> dict:
+    """构造 UPDATE 语句中盈亏字段的 SQL 表达式
 
-    根据交易类型（做多/做空）计算盈亏：
-    - 做多: 盈亏 = (出场价 - 入场价) × 数量
-    - 做空: 盈亏 = (入场价 - 出场价) × 数量
+    计算规则见模块说明中的盈亏计算公式。更新数据中提供的字段直接使用新值，
+    未提供的字段引用数据库中的当前列值，从而在同一条 UPDATE 语句中完成
+    盈亏计算，无需先读取交易记录。
 
     Args:
-        trade: 交易记录对象
+        update_data: 本次更新提供的字段及其新值
 
     Returns:
-        tuple[float, float]: (盈亏金额, 盈亏百分比)
-            如果没有出场价格，返回 (0.0, 0.0)
+        dict: 盈亏相关字段的更新值；出场价格被清空时返回空字典
     """
-    if trade.exit_price is None:
-        return 0.0, 0.0
+    # 出场价格被显式清空时，保持原有盈亏数据不变
+    if "exit_price" in update_data and update_data["exit_price"] is None:
+        return {}
+
+    def value(field: str):
+        return update_data[field] if field in update_data else getattr(Trade, field)
+
+    exit_price = value("exit_price")
+    entry_price = value("entry_price")
+    quantity = value("quantity")
 
     # 根据交易类型计算盈亏
-    if trade.trade_type == "long":
-        # 做多：价格上涨盈利
-        pl = (trade.exit_price - trade.entry_price) * trade.quantity
+    long_pl = (exit_price - entry_price) * quantity
+    short_pl = (entry_price - exit_price) * quantity
+    if "trade_type" in update_data:
+        pl = long_pl if update_data["trade_type"] == TradeType.LONG else short_pl
     else:
-        # 做空：价格下跌盈利
-        pl = (trade.entry_price - trade.exit_price) * trade.quantity
+        pl = case((Trade.trade_type == TradeType.LONG, long_pl), else_=short_pl)
 
     # 计算盈亏百分比
-    pl_percentage = (pl / (trade.entry_price * trade.quantity)) * 100
-    return pl, pl_percentage
+    # 入场价和数量均未修改时，直接使用生成列 pl_denominator 作为分母
+    if "entry_price" in update_data or "quantity" in update_data:
+        denominator = entry_price * quantity
+    else:
+        denominator = Trade.pl_denominator
+    pl_percentage = pl / denominator * 100
+
+    # 未提供出场价格时，仅对已有出场价格的交易重新计算
+    if "exit_price" not in update_data:
+        pl = case((Trade.exit_price.is_(None), Trade.profit_loss), else_=pl)
+        pl_percentage = case(
+            (Trade.exit_price.is_(None), Trade.profit_loss_percentage),
+            else_=pl_percentage,
+        )
+
+    return {"profit_loss": pl, "profit_loss_percentage": pl_percentage}
 
 
 async def get_trade_by_id(db: AsyncSession, trade_id: int) -> Optional[Trade]:
@@ -71,36 +107,147 @@ async def get_trade_by_id(db: AsyncSession, trade_id: int) -> Optional[Trade]:
     Returns:
         Trade: 交易记录对象，如果不存在返回 None
     """
-    result = await db.execute(select(Trade).where(Trade.id == trade_id))
+    result = await db.execute(_SEL_TRADE_BY_ID, {"tid": trade_id})
     return result.scalar_one_or_none()
 
 
+async def get_trade_with_owner_id(
+    db: AsyncSession, trade_id: int
+) -> Optional[Tuple[Trade, int]]:
+    """查询交易记录及其所属投资组合的所有者 ID
+
+    通过 JOIN 一次查询同时取回交易和投资组合的 user_id，
+    所有权校验无需再单独查询投资组合。
+
+    Args:
+        db: 数据库会话
+        trade_id: 交易 ID
+
+    Returns:
+        tuple: (交易记录对象, 所有者用户 ID)，如果交易不存在返回 None
+    """
+    result = await db.execute(_SEL_TRADE_WITH_OWNER, {"tid": trade_id})
+    row = result.one_or_none()
+    if row is None:
+        return None
+    return row[0], row[1]
+
+
 async def get_portfolio_trades(
     db: AsyncSession,
     portfolio_id: int,
-    status: Optional[TradeStatus] = None
+    status: Optional[TradeStatus] = None,
+    *,
+    limit: Optional[int] = None,
+    after: Optional[datetime] = None,
+    after_id: Optional[int] = None
 ) -> List[Trade]:
     """获取投资组合的交易列表
 
-    支持按交易状态筛选，结果按入场时间降序排列。
+    支持按交易状态筛选，结果按入场时间、ID 降序排列。
+    支持基于 (入场时间, ID) 的游标分页（keyset pagination）：传入上一页最后一条
+    交易的入场时间和 ID 作为 after / after_id，即可获取下一页，无需 OFFSET 跳过已读行。
+    入场时间相同的交易由 ID 区分，分页边界落在这组交易中间时不会漏掉剩余记录。
+
+    Args:
+        db: 数据库会话
+        portfolio_id: 投资组合 ID
+        status: 交易状态筛选（可选）
+        limit: 返回的最大记录数（可选，默认返回全部）
+        after: 分页游标，上一页最后一条交易的入场时间（可选）
+        after_id: 分页游标，上一页最后一条交易的 ID（可选，与 after 一起使用）
+
+    Returns:
+        List[Trade]: 交易记录列表，按入场时间、ID 降序排列
+    """
+    query = _portfolio_trades_query(portfolio_id, status, limit, after, after_id)
+    result = await db.execute(query)
+    return list(result.scalars().all())
+
+
+async def list_trades_for_user_portfolio(
+    db: AsyncSession,
+    portfolio_id: int,
+    user_id: int,
+    status: Optional[TradeStatus] = None,
+    *,
+    limit: Optional[int] = None,
+    after: Optional[datetime] = None,
+    after_id: Optional[int] = None
+) -> Tuple[bool, bool, List[Trade]]:
+    """获取用户投资组合的交易列表，同时校验所有权
+
+    交易查询通过 JOIN 限定为该用户的投资组合，有结果即说明投资组合存在且归该用户所有；
+    只有结果为空时才额外查询一次投资组合所有者，以区分"不存在"、"无权访问"和"没有交易"。
 
     Args:
         db: 数据库会话
+        portfolio_id: 投资组合 ID
+        user_id: 当前用户 ID
+        status: 交易状态筛选（可选）
+        limit: 返回的最大记录数（可选，默认返回全部）
+        after: 分页游标，上一页最后一条交易的入场时间（可选）
+        after_id: 分页游标，上一页最后一条交易的 ID（可选，与 after 一起使用）
+
+    Returns:
+        tuple: (投资组合是否存在, 是否归该用户所有, 交易记录列表)
+    """
+    query = (
+        _portfolio_trades_query(portfolio_id, status, limit, after, after_id)
+        .join(Portfolio, Trade.portfolio_id == Portfolio.id)
+        .where(Portfolio.user_id == user_id)
+    )
+    result = await db.execute(query)
+    trades = list(result.scalars().all())
+    if trades:
+        return True, True, trades
+
+    result = await db.execute(_SEL_PORTFOLIO_OWNER, {"pid": portfolio_id})
+    owner_id = result.scalar_one_or_none()
+    if owner_id is None:
+        return False, False, []
+    return True, owner_id == user_id, []
+
+
+def _portfolio_trades_query(
+    portfolio_id: int,
+    status: Optional[TradeStatus],
+    limit: Optional[int],
+    after: Optional[datetime],
+    after_id: Optional[int] = None
+):
+    """构造投资组合交易列表查询
+
+    Args:
         portfolio_id: 投资组合 ID
         status: 交易状态筛选（可选）
+        limit: 返回的最大记录数（可选）
+        after: 分页游标中的入场时间（可选）
+        after_id: 分页游标中的交易 ID（可选）
 
     Returns:
-        List[Trade]: 交易记录列表，按入场时间降序排列
+        Select: 按入场时间、ID 降序排列的交易查询
     """
     query = select(Trade).where(Trade.portfolio_id == portfolio_id)
-    
+
     # 如果指定了状态，添加筛选条件
     if status:
         query = query.where(Trade.status == status)
-    
-    # 按入场时间降序排列（最新的在前）
-    result = await db.execute(query.order_by(Trade.entry_date.desc()))
-    return list(result.scalars().all())
+
+    # 游标分页：从上一页最后一条记录之后继续
+    # (entry_date, id) 组合唯一，入场时间相同的交易按 ID 继续往后取；
+    # 只传 after 时跳过该入场时间的全部交易
+    if after is not None:
+        if after_id is not None:
+            query = query.where(tuple_(Trade.entry_date, Trade.id) < (after, after_id))
+        else:
+            query = query.where(Trade.entry_date < after)
+
+    # 按入场时间降序排列（最新的在前），入场时间相同时按 ID 降序，保证顺序确定
+    query = query.order_by(Trade.entry_date.desc(), Trade.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query
 
 
 async def create_trade(db: AsyncSession, trade: TradeCreate) -> Trade:
@@ -114,11 +261,14 @@ async def create_trade(db: AsyncSession, trade: TradeCreate) -> Trade:
 
     Returns:
         Trade: 创建的交易记录对象
+
+    Note:
+        使用 INSERT ... RETURNING 一次取回自增 ID 和数据库默认值，无需 refresh。
     """
-    db_trade = Trade(**trade.model_dump())
-    db.add(db_trade)
+    stmt = insert(Trade).values(**trade.model_dump()).returning(Trade)
+    result = await db.execute(stmt)
+    db_trade = result.scalar_one()
     await db.commit()
-    await db.refresh(db_trade)
     return db_trade
 
 
@@ -138,26 +288,25 @@ async def update_trade(
 
     Returns:
         Trade: 更新后的交易记录对象，如果不存在返回 None
-    """
-    result = await db.execute(select(Trade).where(Trade.id == trade_id))
-    db_trade = result.scalar_one_or_none()
-
-    if db_trade is None:
-        return None
 
+    Note:
+        盈亏在 UPDATE 语句中直接计算，整个更新只需一次数据库往返。
+    """
     # 只更新提供的字段
     update_data = trade_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_trade, field, value)
-
-    # 如果有出场价格，重新计算盈亏
-    if db_trade.exit_price is not None:
-        pl, pl_pct = calculate_profit_loss(db_trade)
-        db_trade.profit_loss = pl
-        db_trade.profit_loss_percentage = pl_pct
-
+    if not update_data:
+        return await get_trade_by_id(db, trade_id=trade_id)
+
+    # 如果有出场价格，在同一条 UPDATE 语句中重新计算盈亏
+    stmt = fresh_returning(Trade, (
+        update(Trade)
+        .where(Trade.id == trade_id)
+        .values(**update_data, **_profit_loss_values(update_data))
+        .returning(Trade)
+    ))
+    result = await db.execute(stmt)
+    db_trade = result.scalar_one_or_none()
     await db.commit()
-    await db.refresh(db_trade)
     return db_trade
 
 
@@ -173,26 +322,49 @@ async def close_trade(db: AsyncSession, trade_id: int, trade_close: TradeClose)
 
     Returns:
         Trade: 平仓后的交易记录对象，如果交易不存在返回 None
+
+    Note:
+        盈亏在 UPDATE 语句中直接计算（规则见 _profit_loss_values），
+        通过 RETURNING 取回更新后的整行，提交后无需 refresh。
     """
-    result = await db.execute(select(Trade).where(Trade.id == trade_id))
+    close_data = {
+        "exit_price": trade_close.exit_price,
+        "exit_date": trade_close.exit_date,
+        "status": TradeStatus.CLOSED,
+    }
+    stmt = fresh_returning(Trade, (
+        update(Trade)
+        .where(Trade.id == trade_id)
+        .values(**close_data, **_profit_loss_values(close_data))
+        .returning(Trade)
+    ))
+    result = await db.execute(stmt)
     db_trade = result.scalar_one_or_none()
+    await db.commit()
+    return db_trade
 
-    if db_trade is None:
-        return None
 
-    # 设置出场信息
-    db_trade.exit_price = trade_close.exit_price
-    db_trade.exit_date = trade_close.exit_date
-    db_trade.status = TradeStatus.CLOSED
+async def set_screenshot_path(db: AsyncSession, trade_id: int, path: str) -> bool:
+    """设置交易的截图路径
 
-    # 计算盈亏
-    pl, pl_pct = calculate_profit_loss(db_trade)
-    db_trade.profit_loss = pl
-    db_trade.profit_loss_percentage = pl_pct
+    单字段更新直接执行 UPDATE 语句，不经过 TradeUpdate 模型的构造与 model_dump。
+
+    Args:
+        db: 数据库会话
+        trade_id: 交易 ID
+        path: 截图文件名（不含目录）
 
+    Returns:
+        bool: 更新成功返回 True，交易不存在返回 False
+    """
+    result = await db.execute(
+        update(Trade)
+        .where(Trade.id == trade_id)
+        .values(screenshot_path=path)
+        .execution_options(synchronize_session=False)
+    )
     await db.commit()
-    await db.refresh(db_trade)
-    return db_trade
+    return result.rowcount > 0
 
 
 async def delete_trade(db: AsyncSession, trade_id: int) -> bool:
@@ -205,12 +377,6 @@ async def delete_trade(db: AsyncSession, trade_id: int) -> bool:
     Returns:
         bool: 删除成功返回 True，交易不存在返回 False
     """
-    result = await db.execute(select(Trade).where(Trade.id == trade_id))
-    db_trade = result.scalar_one_or_none()
-
-    if db_trade is None:
-        return False
-
-    await db.delete(db_trade)
+    result = await db.execute(delete(Trade).where(Trade.id == trade_id))
     await db.commit()
-    return True
+    return result.rowcount > 0
@@ -10,8 +10,11 @@
 - get_user_by_email: 根据邮箱查询用户
 - get_user_by_username: 根据用户名查询用户
 - get_user_by_id: 根据 ID 查询用户
+- get_user_by_username_or_email: 根据用户名或邮箱查询用户
 - get_users: 分页获取用户列表
 - get_user_count: 获取用户总数
+- users_exist: 判断是否已有用户
+- check_email_username_taken: 检查邮箱和用户名是否已被使用
 - create_user: 创建新用户
 - update_user: 更新用户信息
 - delete_user: 删除用户
@@ -22,14 +25,41 @@
 - 所有函数均为异步函数
 - 密码在创建用户时自动进行哈希处理
 - 删除用户会级联删除其所有投资组合和交易
+- 更新或删除用户后会使认证用户缓存失效
 """
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from app.models import User
+from sqlalchemy import select, func, insert, update, delete, exists, bindparam, or_, case
+from app.crud import fresh_returning
+from app.models import User, Portfolio, Trade
 from app.schemas.user import UserCreate, UserUpdate
-from app.auth.utils import get_password_hash
-from typing import Optional, List
+from app.auth.utils import aget_password_hash
+from app.auth.dependencies import invalidate_user
+from typing import Optional, List, Tuple
+
+# 预构建的查询语句
+# 在模块加载时构建一次，调用时只需绑定参数，省去每次重建 Select 对象的开销
+_SEL_USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+_SEL_USER_BY_USERNAME = select(User).where(User.username == bindparam("username"))
+_SEL_USER_BY_ID = select(User).where(User.id == bindparam("uid"))
+# 用户名优先于邮箱匹配
+_SEL_USER_BY_USERNAME_OR_EMAIL = (
+    select(User)
+    .where(or_(User.username == bindparam("identifier"), User.email == bindparam("identifier")))
+    .order_by(case((User.username == bindparam("identifier"), 0), else_=1))
+    .limit(1)
+)
+_SEL_USER_COUNT = select(func.count(User.id))
+_SEL_USERS_EXIST = select(exists().select_from(User))
+_SEL_EMAIL_OR_USERNAME = (
+    select(User.email, User.username)
+    .where(or_(User.email == bindparam("email"), User.username == bindparam("username")))
+    .limit(2)
+)
+
+# 是否已存在用户
+# 一旦有用户注册，该状态就不会再改变，因此缓存 True 后直接返回
+_has_users = False
 
 
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
@@ -42,7 +72,7 @@ async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     Returns:
         User: 用户对象，如果不存在返回 None
     """
-    result = await db.execute(select(User).where(User.email == email))
+    result = await db.execute(_SEL_USER_BY_EMAIL, {"email": email})
     return result.scalar_one_or_none()
 
 
@@ -56,7 +86,7 @@ async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User
     Returns:
         User: 用户对象，如果不存在返回 None
     """
-    result = await db.execute(select(User).where(User.username == username))
+    result = await db.execute(_SEL_USER_BY_USERNAME, {"username": username})
     return result.scalar_one_or_none()
 
 
@@ -70,22 +100,57 @@ async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
     Returns:
         User: 用户对象，如果不存在返回 None
     """
-    result = await db.execute(select(User).where(User.id == user_id))
+    result = await db.execute(_SEL_USER_BY_ID, {"uid": user_id})
     return result.scalar_one_or_none()
 
 
-async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[User]:
+async def get_user_by_username_or_email(db: AsyncSession, identifier: str) -> Optional[User]:
+    """根据用户名或邮箱查询用户
+
+    一次查询同时匹配用户名和邮箱，两者都匹配到不同用户时优先返回用户名匹配的用户。
+
+    Args:
+        db: 数据库会话
+        identifier: 用户名或邮箱地址
+
+    Returns:
+        User: 用户对象，如果不存在返回 None
+    """
+    result = await db.execute(_SEL_USER_BY_USERNAME_OR_EMAIL, {"identifier": identifier})
+    return result.scalar_one_or_none()
+
+
+async def get_users(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    *,
+    after_id: Optional[int] = None
+) -> List[User]:
     """分页获取用户列表
 
+    结果按 ID 升序排列。推荐使用基于 ID 的游标分页（after_id），
+    通过主键索引直接定位到下一页，耗时不随页码增加；
+    skip（OFFSET）需要扫描并丢弃前面的所有行，仅为兼容旧调用保留。
+
     Args:
         db: 数据库会话
-        skip: 跳过的记录数（用于分页）
+        skip: 跳过的记录数（传入 after_id 时忽略）
         limit: 返回的最大记录数
+        after_id: 分页游标，仅返回 ID 大于该值的用户（可选）
 
     Returns:
         List[User]: 用户列表
     """
-    result = await db.execute(select(User).offset(skip).limit(limit))
+    query = select(User)
+
+    # 游标分页：从上一页最后一条记录之后继续
+    if after_id is not None:
+        query = query.where(User.id > after_id)
+    elif skip:
+        query = query.offset(skip)
+
+    result = await db.execute(query.order_by(User.id).limit(limit))
     return list(result.scalars().all())
 
 
@@ -100,10 +165,53 @@ async def get_user_count(db: AsyncSession) -> int:
     Returns:
         int: 用户总数
     """
-    result = await db.execute(select(func.count(User.id)))
+    result = await db.execute(_SEL_USER_COUNT)
     return result.scalar_one()
 
 
+async def users_exist(db: AsyncSession) -> bool:
+    """判断系统中是否已有用户
+
+    用于注册时判断是否为首个用户。使用 EXISTS 查询，找到一行即停止，
+    不需要统计全表；确认有用户后结果缓存在进程内，后续调用不再查询数据库。
+
+    Args:
+        db: 数据库会话
+
+    Returns:
+        bool: 已有用户返回 True，否则返回 False
+    """
+    global _has_users
+    if _has_users:
+        return True
+
+    result = await db.execute(_SEL_USERS_EXIST)
+    _has_users = bool(result.scalar())
+    return _has_users
+
+
+async def check_email_username_taken(
+    db: AsyncSession, email: str, username: str
+) -> Tuple[bool, bool]:
+    """一次查询检查邮箱和用户名是否已被使用
+
+    邮箱和用户名各自唯一，因此最多匹配两行。
+
+    Args:
+        db: 数据库会话
+        email: 邮箱地址
+        username: 用户名
+
+    Returns:
+        Tuple[bool, bool]: (邮箱是否已注册, 用户名是否已被使用)
+    """
+    result = await db.execute(_SEL_EMAIL_OR_USERNAME, {"email": email, "username": username})
+    rows = result.all()
+    email_taken = any(row.email == email for row in rows)
+    username_taken = any(row.username == username for row in rows)
+    return email_taken, username_taken
+
+
 async def create_user(db: AsyncSession, user: UserCreate, is_admin: bool = False) -> User:
     """创建新用户
 
@@ -116,23 +224,24 @@ async def create_user(db: AsyncSession, user: UserCreate, is_admin: bool = False
 
     Returns:
         User: 创建的用户对象
+
+    Note:
+        使用 INSERT ... RETURNING 一次取回自增 ID 和数据库默认值，无需 refresh。
     """
     # 对密码进行哈希处理
-    hashed_password = get_password_hash(user.password)
-    
-    # 创建用户对象
-    db_user = User(
+    hashed_password = await aget_password_hash(user.password)
+
+    # 插入用户记录并返回完整的用户对象
+    stmt = insert(User).values(
         email=user.email,
         username=user.username,
         full_name=user.full_name,
         hashed_password=hashed_password,
         is_admin=is_admin
-    )
-    
-    # 保存到数据库
-    db.add(db_user)
+    ).returning(User)
+    result = await db.execute(stmt)
+    db_user = result.scalar_one()
     await db.commit()
-    await db.refresh(db_user)
     return db_user
 
 
@@ -148,20 +257,27 @@ async def update_user(db: AsyncSession, user_id: int, user_update: UserUpdate) -
 
     Returns:
         User: 更新后的用户对象，如果用户不存在返回 None
-    """
-    result = await db.execute(select(User).where(User.id == user_id))
-    db_user = result.scalar_one_or_none()
-
-    if db_user is None:
-        return None
 
+    Note:
+        使用单条 UPDATE ... RETURNING 语句完成更新并取回最新数据。
+    """
     # 只更新提供的字段
     update_data = user_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_user, field, value)
-
+    if not update_data:
+        return await get_user_by_id(db, user_id=user_id)
+
+    stmt = fresh_returning(User, (
+        update(User)
+        .where(User.id == user_id)
+        .values(**update_data)
+        .returning(User)
+    ))
+    result = await db.execute(stmt)
+    db_user = result.scalar_one_or_none()
     await db.commit()
-    await db.refresh(db_user)
+
+    if db_user is not None:
+        invalidate_user(user_id)
     return db_user
 
 
@@ -176,13 +292,27 @@ async def delete_user(db: AsyncSession, user_id: int) -> bool:
 
     Returns:
         bool: 删除成功返回 True，用户不存在返回 False
+
+    Note:
+        直接执行 DELETE 语句，不再将用户及其关联对象加载到会话中。
+        子记录先于父记录删除，因此不依赖数据库是否启用外键级联。
     """
-    result = await db.execute(select(User).where(User.id == user_id))
-    db_user = result.scalar_one_or_none()
+    user_portfolios = select(Portfolio.id).where(Portfolio.user_id == user_id)
+    await db.execute(
+        delete(Trade)
+        .where(Trade.portfolio_id.in_(user_portfolios))
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(Portfolio)
+        .where(Portfolio.user_id == user_id)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(delete(User).where(User.id == user_id))
+    await db.commit()
 
-    if db_user is None:
+    if result.rowcount == 0:
         return False
 
-    await db.delete(db_user)
-    await db.commit()
+    invalidate_user(user_id)
     return True
@@ -23,11 +23,19 @@
 技术细节
 --------
 
-- 使用 aiosqlite 驱动实现 SQLite 异步访问
+- 使用 aiosqlite 驱动实现 SQLite 异步访问，并启用 WAL 日志模式
+- 非 SQLite 数据库使用可配置大小的连接池，并开启 pool_pre_ping
+- DEBUG 模式下 SQL 日志经由 QueueHandler 在后台线程输出，不阻塞事件循环
 - 会话配置 `expire_on_commit=False` 避免访问已提交对象时的额外查询
 - 数据库表在应用启动时自动创建（如不存在）
 """
 
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from app.config import get_settings
@@ -35,21 +43,71 @@ from app.config import get_settings
 # 获取应用配置
 settings = get_settings()
 
+# 是否使用 SQLite 数据库
+_is_sqlite = make_url(settings.DATABASE_URL).get_backend_name() == "sqlite"
+
+# 连接参数
+# - SQLite: 使用驱动默认的连接池，允许跨线程使用连接
+# - 其他数据库: 配置连接池大小，并在取出连接前检测连接是否存活
+#   引擎在模块导入时创建一次，每个进程一个连接池；多 worker 部署时
+#   连接总数上限为 worker 数 × (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+if _is_sqlite:
+    _engine_kwargs = {"connect_args": {"check_same_thread": False}}
+else:
+    _engine_kwargs = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": 30,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+
+def _setup_sql_logging() -> None:
+    """配置非阻塞的 SQL 日志输出
+
+    SQLAlchemy 的 echo=True 会在事件循环线程中同步写 stdout。这里改为
+    将日志记录放入队列，由后台 QueueListener 线程负责实际输出。
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, logging.StreamHandler())
+    listener.start()
+    atexit.register(listener.stop)
+
+    sql_logger = logging.getLogger("sqlalchemy.engine")
+    sql_logger.addHandler(QueueHandler(log_queue))
+    sql_logger.setLevel(logging.INFO)
+
+
+# 仅在调试模式下输出 SQL 语句，避免每条查询都经过日志系统
+if settings.DEBUG:
+    _setup_sql_logging()
+
 # 创建异步数据库引擎
-# - echo=True: 开发模式下打印 SQL 语句
+# - echo 保持关闭，SQL 日志由上面的队列日志处理器负责
 # - future=True: 使用 SQLAlchemy 2.0 风格
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=True,
-    future=True
+    future=True,
+    **_engine_kwargs
 )
 
+if _is_sqlite:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        """为每个新连接启用 WAL 日志模式，读写操作互不阻塞"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
 # 创建异步会话工厂
 # - expire_on_commit=False: 提交后不自动过期对象，避免延迟加载问题
+# - autoflush=False: 查询前不自动 flush，CRUD 函数均显式 commit
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
-    expire_on_commit=False
+    expire_on_commit=False,
+    autoflush=False
 )
 
 # ORM 模型基类
@@ -61,6 +119,7 @@ async def get_db():
     """获取数据库会话（依赖注入）
 
     作为 FastAPI 依赖项使用，自动管理会话的创建和关闭。
+    async with 退出时会自动关闭会话，无需额外的 try/finally。
 
     Yields:
         AsyncSession: 异步数据库会话
@@ -72,24 +131,77 @@ async def get_db():
         >>>     return result.scalars().all()
     """
     async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+        yield session
+
+
+def _upgrade_schema(sync_conn) -> None:
+    """为已有数据库补充新增的列和索引
+
+    create_all 不会修改已存在的表，这里补齐后续版本新增的生成列和索引，
+    转换旧的枚举存储格式，并删除已被复合索引取代的旧索引。
+    SQLite 的 ALTER TABLE 只能添加 VIRTUAL 生成列，其他数据库添加 STORED 列。
+
+    Args:
+        sync_conn: 同步数据库连接（由 run_sync 传入）
+    """
+    inspector = inspect(sync_conn)
+    if not inspector.has_table("trades"):
+        return
+
+    columns = {column["name"] for column in inspector.get_columns("trades")}
+    if "pl_denominator" not in columns:
+        kind = "VIRTUAL" if sync_conn.dialect.name == "sqlite" else "STORED"
+        sync_conn.exec_driver_sql(
+            "ALTER TABLE trades ADD COLUMN pl_denominator FLOAT "
+            f"GENERATED ALWAYS AS (entry_price * quantity) {kind}"
+        )
+
+    # 枚举列改为单字符编码存储，将旧数据中的枚举名称（LONG/SHORT/OPEN/CLOSED）
+    # 转换为对应编码，编码恰好是名称的首字母
+    sync_conn.exec_driver_sql(
+        "UPDATE trades SET trade_type = substr(trade_type, 1, 1) WHERE length(trade_type) > 1"
+    )
+    sync_conn.exec_driver_sql(
+        "UPDATE trades SET status = substr(status, 1, 1) WHERE length(status) > 1"
+    )
+
+    # 补建模型中声明但数据库中缺失的索引
+    # 同名索引的列数与模型不一致时（如复合索引追加了 id 列）先删除再按模型重建
+    for table_name in ("trades", "portfolios"):
+        table = Base.metadata.tables.get(table_name)
+        if table is None or not inspector.has_table(table_name):
+            continue
+        table_indexes = {
+            index["name"]: index["column_names"]
+            for index in inspector.get_indexes(table_name)
+        }
+        for index in table.indexes:
+            if index.name not in table_indexes:
+                index.create(sync_conn)
+            elif len(table_indexes[index.name]) != len(index.expressions):
+                index.drop(sync_conn)
+                index.create(sync_conn)
+
+    existing_indexes = {index["name"] for index in inspector.get_indexes("trades")}
+
+    # symbol 单列索引已由 (portfolio_id, status, symbol) 复合索引取代
+    if "ix_trades_symbol" in existing_indexes:
+        sync_conn.exec_driver_sql("DROP INDEX ix_trades_symbol")
 
 
 async def init_db():
     """初始化数据库
 
-    创建所有已定义的数据库表（如果不存在）。
+    创建所有已定义的数据库表（如果不存在），并为已有表补充新增的列和索引。
     此函数在应用启动时调用。
 
     注意事项
     --------
 
-    - 仅创建不存在的表，不会修改已有表结构
+    - 仅创建不存在的表，已有表只会补充新增的列和索引
     - 生产环境建议使用 Alembic 进行数据库迁移
     """
     async with engine.begin() as conn:
         # 同步执行表创建操作
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_upgrade_schema)
@@ -11,6 +11,7 @@ FastAPI 应用入口模块
 - CORS 跨域资源共享配置
 - CSRF 跨站请求伪造保护
 - API 路由注册
+- 默认使用 ORJSONResponse 序列化响应
 
 API 文档
 --------
@@ -31,11 +32,13 @@ API 文档
 """
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.database import init_db
 from app.routers import auth, users, portfolios, trades, analytics
 from app.middleware.csrf import CSRFProtectMiddleware
+from app.middleware.upload_limit import UploadSizeLimitMiddleware
 
 
 @asynccontextmanager
@@ -66,13 +69,19 @@ async def lifespan(app: FastAPI):
 
 
 # 创建 FastAPI 应用实例
+# - default_response_class: 所有端点默认使用基于 orjson（C 扩展）的 ORJSONResponse 序列化
 app = FastAPI(
     title="Trade Journal API",
     description="API for managing trading portfolios and journals",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# 上传大小限制中间件
+# 在 multipart 请求体被解析和写入临时文件之前拒绝超大的截图上传
+app.add_middleware(UploadSizeLimitMiddleware, max_body_size=trades.MAX_UPLOAD_REQUEST_SIZE)
+
 # CORS 中间件配置
 # 允许前端应用跨域访问 API
 app.add_middleware(
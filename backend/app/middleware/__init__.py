@@ -8,12 +8,14 @@
 --------
 
 - **csrf**: CSRF (跨站请求伪造) 保护中间件
+- **upload_limit**: 截图上传请求体大小限制中间件
 
 中间件执行顺序
 --------------
 
 1. CORS 中间件 - 处理跨域请求
 2. CSRF 中间件 - 验证 CSRF 令牌
+3. 上传大小限制中间件 - 拒绝超大的截图上传请求
 
 注意事项
 --------
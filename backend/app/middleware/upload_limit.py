@@ -0,0 +1,131 @@
+"""
+上传大小限制中间件模块
+
+本模块在路由解析 multipart 请求体之前限制截图上传请求的大小。
+FastAPI 会先读取并解析完整的表单（上传文件写入临时文件）再调用端点，
+端点内的大小检查无法阻止超大请求体被接收。
+
+工作原理
+--------
+
+1. 只处理 POST /api/trades/{trade_id}/screenshot 请求
+2. Content-Length 超过上限时直接返回 413，不调用下游应用
+3. 包装 receive 通道累计已接收的字节数，未携带 Content-Length
+   （分块传输）或实际长度超出声明时，一旦超过上限即抛出 413
+
+注意事项
+--------
+
+上限针对整个请求体，包含 multipart 边界和各部分的头部，
+因此应比文件大小上限略大。
+"""
+
+import orjson
+from fastapi import HTTPException, status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 需要限制大小的上传路径：/api/trades/{trade_id}/screenshot
+UPLOAD_PATH_PREFIX = "/api/trades/"
+UPLOAD_PATH_SUFFIX = "/screenshot"
+
+# 超出上限时的响应（与端点内的 413 错误信息一致）
+_TOO_LARGE_DETAIL = "File too large (max 10 MiB)"
+_TOO_LARGE_BODY = orjson.dumps({"detail": _TOO_LARGE_DETAIL})
+
+
+class UploadSizeLimitMiddleware:
+    """截图上传请求体大小限制中间件
+
+    纯 ASGI 中间件，在请求体被读取之前按 Content-Length 拒绝超大请求，
+    并在读取过程中按实际字节数限制请求体大小。
+
+    Attributes:
+        app: 下游 ASGI 应用
+        max_body_size: 允许的最大请求体字节数
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """处理请求
+
+        Args:
+            scope: ASGI 连接信息
+            receive: ASGI 接收通道
+            send: ASGI 发送通道
+        """
+        if not self._is_upload(scope):
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > self.max_body_size:
+                    await self._send_too_large(send)
+                    return
+                break
+
+        await self.app(scope, self._limited_receive(receive), send)
+
+    @staticmethod
+    def _is_upload(scope: Scope) -> bool:
+        """判断是否为截图上传请求
+
+        Args:
+            scope: ASGI 连接信息
+
+        Returns:
+            bool: POST /api/trades/{trade_id}/screenshot 时返回 True
+        """
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return False
+        path: str = scope["path"]
+        return path.startswith(UPLOAD_PATH_PREFIX) and path.endswith(UPLOAD_PATH_SUFFIX)
+
+    def _limited_receive(self, receive: Receive) -> Receive:
+        """包装 receive 通道，累计请求体字节数
+
+        超过上限时抛出 HTTPException，由 FastAPI 的异常处理返回 413 响应，
+        剩余的请求体不再读取。
+
+        Args:
+            receive: 原始 ASGI 接收通道
+
+        Returns:
+            Receive: 限制大小的接收通道
+        """
+        received = 0
+        max_body_size = self.max_body_size
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=_TOO_LARGE_DETAIL
+                    )
+            return message
+
+        return limited_receive
+
+    @staticmethod
+    async def _send_too_large(send: Send) -> None:
+        """直接发送 413 JSON 响应
+
+        Args:
+            send: ASGI 发送通道
+        """
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-length", str(len(_TOO_LARGE_BODY)).encode("latin-1")),
+                (b"content-type", b"application/json"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": _TOO_LARGE_BODY})
@@ -17,6 +17,11 @@ portfolios 表包含以下字段：
 - created_at: 创建时间
 - updated_at: 更新时间
 
+索引
+----
+
+- ix_portfolios_user_id: (user_id)，按用户列出投资组合及所有权校验
+
 关系
 ----
 
@@ -57,7 +62,7 @@ class Portfolio(Base):
     initial_balance = Column(Float, default=0.0)  # 初始资金（INR）
     
     # 外键：所属用户
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     
     # 时间戳
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -68,4 +73,7 @@ class Portfolio(Base):
     
     # 关系：组合内的交易记录
     # cascade="all, delete-orphan": 删除组合时同时删除其所有交易
-    trades = relationship("Trade", back_populates="portfolio", cascade="all, delete-orphan")
+    # passive_deletes=True: 由数据库外键级联删除交易，无需先加载到内存
+    trades = relationship(
+        "Trade", back_populates="portfolio", cascade="all, delete-orphan", passive_deletes=True
+    )
@@ -21,18 +21,29 @@ trades 表包含以下字段：
 - exit_date: 出场时间（平仓时填写）
 - profit_loss: 盈亏金额（自动计算）
 - profit_loss_percentage: 盈亏百分比（自动计算）
+- pl_denominator: 持仓成本 entry_price × quantity（数据库生成列）
 - notes: 交易笔记
 - tags: 标签（逗号分隔）
-- screenshot_path: 截图文件路径
+- screenshot_path: 截图文件名（位于 uploads/screenshots/ 下）
+
+索引
+----
+
+- ix_trade_portfolio_entry: (portfolio_id, entry_date DESC, id DESC)
+- ix_trade_portfolio_entry_date: (portfolio_id, status, entry_date DESC, id DESC)
+- ix_trade_portfolio_profit_loss: (portfolio_id, status, profit_loss)
+- ix_trade_portfolio_symbol: (portfolio_id, status, symbol)
 
 枚举类型
 --------
 
 - TradeType: 交易类型（long=做多, short=做空）
 - TradeStatus: 交易状态（open=持仓中, closed=已平仓）
+
+数据库中以单字符编码存储：L/S（交易类型）、O/C（交易状态）。
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import Column, Computed, Integer, String, Float, DateTime, ForeignKey, Text, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -61,6 +72,21 @@ class TradeStatus(str, enum.Enum):
     CLOSED = "closed"
 
 
+def _enum_codes(enum_cls) -> list:
+    """返回枚举在数据库中存储的单字符编码
+
+    编码为枚举值的首字母大写（long → L, short → S, open → O, closed → C），
+    使 trade_type / status 列每行只占一个字符，索引更紧凑、比较更快。
+
+    Args:
+        enum_cls: 枚举类
+
+    Returns:
+        list: 与枚举成员顺序一致的编码列表
+    """
+    return [member.value[0].upper() for member in enum_cls]
+
+
 class Trade(Base):
     """交易记录模型
 
@@ -86,9 +112,10 @@ class Trade(Base):
         exit_date: 出场日期时间（平仓时设置）
         profit_loss: 盈亏金额（INR）
         profit_loss_percentage: 盈亏百分比
+        pl_denominator: 持仓成本（入场价 × 数量），盈亏百分比的分母
         notes: 交易笔记和策略说明
         tags: 标签，用于分类（逗号分隔）
-        screenshot_path: 交易截图文件路径
+        screenshot_path: 交易截图文件名
         created_at: 记录创建时间
         updated_at: 记录更新时间
         portfolio: 所属投资组合对象
@@ -99,12 +126,19 @@ class Trade(Base):
     id = Column(Integer, primary_key=True, index=True)
     
     # 外键：所属投资组合
-    portfolio_id = Column(Integer, ForeignKey("portfolios.id"), nullable=False)
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=False)
 
     # 交易基本信息
-    symbol = Column(String, nullable=False, index=True)  # 股票代码，建立索引以加速查询
-    trade_type = Column(Enum(TradeType), nullable=False)  # 做多/做空
-    status = Column(Enum(TradeStatus), default=TradeStatus.OPEN)  # 默认为持仓中
+    symbol = Column(String, nullable=False)  # 股票代码（由复合索引 ix_trade_portfolio_symbol 覆盖）
+    # 枚举以单字符编码存储为普通字符串列，不使用数据库原生 ENUM 类型
+    trade_type = Column(
+        Enum(TradeType, native_enum=False, length=1, values_callable=_enum_codes),
+        nullable=False
+    )  # 做多/做空（L/S）
+    status = Column(
+        Enum(TradeStatus, native_enum=False, length=1, values_callable=_enum_codes),
+        default=TradeStatus.OPEN
+    )  # 默认为持仓中（O/C）
 
     # 入场信息
     entry_price = Column(Float, nullable=False)  # 入场价格
@@ -119,14 +153,35 @@ class Trade(Base):
     profit_loss = Column(Float, nullable=True)  # 盈亏金额（INR）
     profit_loss_percentage = Column(Float, nullable=True)  # 盈亏百分比
 
+    # 持仓成本（由数据库根据入场价和数量自动生成并存储）
+    pl_denominator = Column(Float, Computed("entry_price * quantity", persisted=True))
+
     # 附加信息
     notes = Column(Text, nullable=True)  # 交易笔记
     tags = Column(String, nullable=True)  # 标签（逗号分隔，如"突破,趋势"）
-    screenshot_path = Column(String, nullable=True)  # 截图文件路径
+    screenshot_path = Column(String, nullable=True)  # 截图文件名（不含目录）
 
     # 时间戳
+    # 两个字段的值都由数据库的 CURRENT_TIMESTAMP 生成，Python 侧不构造 datetime；
+    # SQLite 不支持 ON UPDATE 子句，因此 updated_at 使用 onupdate 把 func.now()
+    # 写进 UPDATE 语句，而不是只声明 server_onupdate
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # 关系：所属投资组合
     portfolio = relationship("Portfolio", back_populates="trades")
+
+    # 复合索引
+    # - ix_trade_portfolio_entry: 不按状态筛选的交易列表，按 (入场时间, ID) 倒序排列时无需额外排序
+    # - ix_trade_portfolio_entry_date: 按投资组合和状态筛选、按 (入场时间, ID) 倒序排列的交易列表查询
+    #   （也覆盖只查询持仓中交易的场景，无需单独的 status = 'O' 部分索引）
+    #   两个索引都以 id DESC 结尾，与分页游标的排序一致；SQLite 隐式附带的 rowid
+    #   是升序的，缺少这一列时仍需对入场时间相同的行再排序一次
+    # - ix_trade_portfolio_profit_loss: 投资组合已平仓交易的盈亏聚合（只需读取索引）
+    # - ix_trade_portfolio_symbol: 投资组合已平仓交易按股票代码分组统计
+    __table_args__ = (
+        Index("ix_trade_portfolio_entry", "portfolio_id", entry_date.desc(), id.desc()),
+        Index("ix_trade_portfolio_entry_date", "portfolio_id", "status", entry_date.desc(), id.desc()),
+        Index("ix_trade_portfolio_profit_loss", "portfolio_id", "status", "profit_loss"),
+        Index("ix_trade_portfolio_symbol", "portfolio_id", "status", "symbol"),
+    )
@@ -70,4 +70,7 @@ class User(Base):
 
     # 关系：用户拥有的投资组合
     # cascade="all, delete-orphan": 删除用户时同时删除其所有投资组合
-    portfolios = relationship("Portfolio", back_populates="owner", cascade="all, delete-orphan")
+    # passive_deletes=True: 由数据库外键级联删除投资组合，无需先加载到内存
+    portfolios = relationship(
+        "Portfolio", back_populates="owner", cascade="all, delete-orphan", passive_deletes=True
+    )
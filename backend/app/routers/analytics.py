@@ -30,52 +30,54 @@ API 端点
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
-from typing import Dict, Any
+from sqlalchemy import select, func, and_, case
+from typing import Optional
 from app.database import get_db
 from app.models import Trade, Portfolio
 from app.models.trade import TradeStatus
-from app.crud import portfolio as portfolio_crud
 from app.auth.dependencies import get_current_active_user
 from app.models import User
 
 # 创建路由器
+# 分析结果是较大的嵌套字典，端点直接返回 ORJSONResponse（response_model=None），
+# 跳过响应模型校验和 jsonable_encoder
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
 
-async def verify_portfolio_ownership(portfolio_id: int, user_id: int, db: AsyncSession):
-    """验证用户对投资组合的所有权
+# 已平仓交易的连接条件
+# 以投资组合为主表 LEFT JOIN 交易，所有权信息和统计结果在同一次查询中返回
+_closed_trades_join = and_(
+    Trade.portfolio_id == Portfolio.id,
+    Trade.status == TradeStatus.CLOSED
+)
 
-    在进行数据分析前，验证用户是否拥有对应的投资组合。
+
+def check_portfolio_access(owner_id: Optional[int], user_id: int) -> None:
+    """根据查询结果验证用户对投资组合的所有权
 
     Args:
-        portfolio_id: 投资组合 ID
+        owner_id: 查询得到的投资组合所有者 ID，投资组合不存在时为 None
         user_id: 当前用户 ID
-        db: 数据库会话
-
-    Returns:
-        Portfolio: 投资组合对象
 
     Raises:
         HTTPException: 404 - 投资组合不存在
         HTTPException: 403 - 用户无权访问该投资组合
     """
-    portfolio = await portfolio_crud.get_portfolio_by_id(db, portfolio_id=portfolio_id)
-    if not portfolio:
+    if owner_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Portfolio not found"
         )
-    if portfolio.user_id != user_id:
+    if owner_id != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this portfolio"
         )
-    return portfolio
 
 
-@router.get("/portfolio/{portfolio_id}", response_model=Dict[str, Any])
+@router.get("/portfolio/{portfolio_id}", response_model=None)
 async def get_portfolio_analytics(
     portfolio_id: int,
     db: AsyncSession = Depends(get_db),
@@ -104,33 +106,38 @@ async def get_portfolio_analytics(
         current_user: 当前登录用户
 
     Returns:
-        Dict: 包含各项分析指标的字典
+        ORJSONResponse: 包含各项分析指标的 JSON 响应
 
     Note:
         - 仅统计已平仓（CLOSED）的交易
         - 如果没有已平仓交易，所有指标返回 0 或 None
     """
-    portfolio = await verify_portfolio_ownership(portfolio_id, current_user.id, db)
-
-    # 查询所有已平仓交易
+    # 在数据库中一次完成所有权查询和全部聚合，只返回一行汇总结果
+    # profit_loss 为空的交易按 0 计算，并归入亏损交易
+    pl = func.coalesce(Trade.profit_loss, 0.0)
     result = await db.execute(
-        select(Trade).where(
-            and_(
-                Trade.portfolio_id == portfolio_id,
-                Trade.status == TradeStatus.CLOSED
-            )
+        select(
+            Portfolio.user_id,
+            Portfolio.name,
+            func.count(Trade.id),
+            func.coalesce(func.sum(pl), 0.0),
+            func.sum(case((pl > 0, 1), else_=0)),
+            func.coalesce(func.sum(case((pl > 0, pl), else_=0.0)), 0.0),
+            func.coalesce(func.sum(case((pl <= 0, pl), else_=0.0)), 0.0),
         )
+        .outerjoin(Trade, _closed_trades_join)
+        .where(Portfolio.id == portfolio_id)
+        .group_by(Portfolio.id)
     )
-    closed_trades = list(result.scalars().all())
+    row = result.one_or_none()
+    check_portfolio_access(row[0] if row else None, current_user.id)
+    _, portfolio_name, total_trades, total_pl, total_wins, total_win_amount, total_loss_sum = row
 
-    # 计算统计数据
-    total_trades = len(closed_trades)
-    
     # 如果没有已平仓交易，返回零值
     if total_trades == 0:
-        return {
+        return ORJSONResponse({
             "portfolio_id": portfolio_id,
-            "portfolio_name": portfolio.name,
+            "portfolio_name": portfolio_name,
             "total_trades": 0,
             "total_profit_loss": 0.0,
             "win_rate": 0.0,
@@ -142,40 +149,37 @@ async def get_portfolio_analytics(
             "average_win": 0.0,
             "average_loss": 0.0,
             "profit_factor": 0.0,
-        }
-
-    # 计算总盈亏
-    total_pl = sum(t.profit_loss or 0 for t in closed_trades)
-    
-    # 分类盈利和亏损交易
-    winning_trades = [t for t in closed_trades if (t.profit_loss or 0) > 0]
-    losing_trades = [t for t in closed_trades if (t.profit_loss or 0) <= 0]
-
-    total_wins = len(winning_trades)
-    total_losses = len(losing_trades)
-    
+        })
+
+    total_losses = total_trades - total_wins
+
     # 计算胜率
-    win_rate = (total_wins / total_trades) * 100 if total_trades > 0 else 0
+    win_rate = (total_wins / total_trades) * 100
 
     # 计算平均值
-    avg_pl = total_pl / total_trades if total_trades > 0 else 0
-    avg_win = sum(t.profit_loss for t in winning_trades) / total_wins if total_wins > 0 else 0
-    avg_loss = sum(t.profit_loss for t in losing_trades) / total_losses if total_losses > 0 else 0
+    avg_pl = total_pl / total_trades
+    avg_win = total_win_amount / total_wins if total_wins > 0 else 0
+    avg_loss = total_loss_sum / total_losses if total_losses > 0 else 0
 
     # 计算盈利因子（Profit Factor）
     # 盈利因子 = 总盈利 / |总亏损|
     # 盈利因子 > 1 表示整体盈利
-    total_win_amount = sum(t.profit_loss for t in winning_trades)
-    total_loss_amount = abs(sum(t.profit_loss for t in losing_trades))
+    total_loss_amount = abs(total_loss_sum)
     profit_factor = total_win_amount / total_loss_amount if total_loss_amount > 0 else 0
 
-    # 找出最佳和最差交易
-    best_trade = max(closed_trades, key=lambda t: t.profit_loss or 0)
-    worst_trade = min(closed_trades, key=lambda t: t.profit_loss or 0)
+    # 找出最佳和最差交易（各一次按盈亏排序的单行查询）
+    trade_columns = select(Trade.id, Trade.symbol, pl.label("profit_loss")).where(
+        and_(
+            Trade.portfolio_id == portfolio_id,
+            Trade.status == TradeStatus.CLOSED
+        )
+    )
+    best_trade = (await db.execute(trade_columns.order_by(pl.desc(), Trade.id).limit(1))).one()
+    worst_trade = (await db.execute(trade_columns.order_by(pl.asc(), Trade.id).limit(1))).one()
 
-    return {
+    return ORJSONResponse({
         "portfolio_id": portfolio_id,
-        "portfolio_name": portfolio.name,
+        "portfolio_name": portfolio_name,
         "total_trades": total_trades,
         "total_profit_loss": round(total_pl, 2),
         "win_rate": round(win_rate, 2),
@@ -183,22 +187,22 @@ async def get_portfolio_analytics(
         "best_trade": {
             "id": best_trade.id,
             "symbol": best_trade.symbol,
-            "profit_loss": round(best_trade.profit_loss or 0, 2),
+            "profit_loss": round(best_trade.profit_loss, 2),
         },
         "worst_trade": {
             "id": worst_trade.id,
             "symbol": worst_trade.symbol,
-            "profit_loss": round(worst_trade.profit_loss or 0, 2),
+            "profit_loss": round(worst_trade.profit_loss, 2),
         },
         "total_wins": total_wins,
         "total_losses": total_losses,
         "average_win": round(avg_win, 2),
         "average_loss": round(avg_loss, 2),
         "profit_factor": round(profit_factor, 2),
-    }
+    })
 
 
-@router.get("/portfolio/{portfolio_id}/by-symbol", response_model=Dict[str, Any])
+@router.get("/portfolio/{portfolio_id}/by-symbol", response_model=None)
 async def get_analytics_by_symbol(
     portfolio_id: int,
     db: AsyncSession = Depends(get_db),
@@ -225,7 +229,7 @@ async def get_analytics_by_symbol(
         current_user: 当前登录用户
 
     Returns:
-        Dict: 包含各股票统计数据的字典
+        ORJSONResponse: 包含各股票统计数据的 JSON 响应
 
     Example:
         >>> # 返回示例
@@ -236,49 +240,37 @@ async def get_analytics_by_symbol(
         >>>     ]
         >>> }
     """
-    await verify_portfolio_ownership(portfolio_id, current_user.id, db)
-
-    # 查询所有已平仓交易
+    # 在数据库中按股票代码分组聚合，每个股票只返回一行
+    # 同一查询返回投资组合所有者；没有已平仓交易时只有一行 symbol 为 NULL 的结果
+    pl = func.coalesce(Trade.profit_loss, 0.0)
     result = await db.execute(
-        select(Trade).where(
-            and_(
-                Trade.portfolio_id == portfolio_id,
-                Trade.status == TradeStatus.CLOSED
-            )
+        select(
+            Portfolio.user_id,
+            Trade.symbol,
+            func.count(Trade.id),
+            func.coalesce(func.sum(pl), 0.0),
+            func.sum(case((pl > 0, 1), else_=0)),
         )
+        .outerjoin(Trade, _closed_trades_join)
+        .where(Portfolio.id == portfolio_id)
+        .group_by(Portfolio.user_id, Trade.symbol)
+        .order_by(Trade.symbol)
     )
-    closed_trades = list(result.scalars().all())
-
-    # 按股票代码分组统计
-    symbol_stats = {}
-    for trade in closed_trades:
-        symbol = trade.symbol
-        
-        # 初始化股票统计
-        if symbol not in symbol_stats:
-            symbol_stats[symbol] = {
+    rows = result.all()
+    check_portfolio_access(rows[0][0] if rows else None, current_user.id)
+
+    # 组装各股票统计并计算胜率
+    return ORJSONResponse({
+        "symbols": [
+            {
                 "symbol": symbol,
-                "total_trades": 0,
-                "total_profit_loss": 0.0,
-                "wins": 0,
-                "losses": 0,
+                "total_trades": total,
+                "total_profit_loss": round(total_pl, 2),
+                "wins": wins,
+                "losses": total - wins,
+                "win_rate": round((wins / total) * 100, 2),
             }
-
-        # 更新统计数据
-        symbol_stats[symbol]["total_trades"] += 1
-        symbol_stats[symbol]["total_profit_loss"] += trade.profit_loss or 0
-        
-        # 统计盈亏次数
-        if (trade.profit_loss or 0) > 0:
-            symbol_stats[symbol]["wins"] += 1
-        else:
-            symbol_stats[symbol]["losses"] += 1
-
-    # 计算各股票的胜率
-    for symbol in symbol_stats:
-        total = symbol_stats[symbol]["total_trades"]
-        wins = symbol_stats[symbol]["wins"]
-        symbol_stats[symbol]["win_rate"] = round((wins / total) * 100, 2) if total > 0 else 0
-        symbol_stats[symbol]["total_profit_loss"] = round(symbol_stats[symbol]["total_profit_loss"], 2)
-
-    return {"symbols": list(symbol_stats.values())}
+            for _, symbol, total, total_pl, wins in rows
+            if symbol is not None
+        ]
+    })
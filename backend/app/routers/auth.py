@@ -25,7 +25,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.schemas.user import UserCreate, User, Token
 from app.crud import user as user_crud
-from app.auth.utils import verify_password, create_access_token
+from app.auth.utils import DUMMY_PASSWORD_HASH, averify_password, create_access_token
 from app.auth.dependencies import get_current_active_user
 from app.config import get_settings
 
@@ -46,9 +46,8 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     --------
 
     1. 检查是否为首个用户（用于确定管理员权限）
-    2. 验证邮箱是否已被注册
-    3. 验证用户名是否已被使用
-    4. 创建用户账户
+    2. 验证邮箱是否已被注册、用户名是否已被使用（同一次查询）
+    3. 创建用户账户
 
     Args:
         user: 用户注册信息
@@ -61,20 +60,18 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
         HTTPException: 400 - 邮箱已注册或用户名已被使用
     """
     # 检查是否为首个用户（首个用户将成为管理员）
-    user_count = await user_crud.get_user_count(db)
-    is_first_user = user_count == 0
+    is_first_user = not await user_crud.users_exist(db)
 
-    # 检查邮箱是否已存在
-    db_user = await user_crud.get_user_by_email(db, email=user.email)
-    if db_user:
+    # 一次查询检查邮箱和用户名是否已存在
+    email_taken, username_taken = await user_crud.check_email_username_taken(
+        db, email=user.email, username=user.username
+    )
+    if email_taken:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-
-    # 检查用户名是否已存在
-    db_user = await user_crud.get_user_by_username(db, username=user.username)
-    if db_user:
+    if username_taken:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
@@ -96,11 +93,10 @@ async def login(
     登录流程
     --------
 
-    1. 尝试通过用户名查找用户
-    2. 如果未找到，尝试通过邮箱查找用户
-    3. 验证密码
-    4. 检查账户是否激活
-    5. 生成并返回 JWT 令牌
+    1. 通过用户名或邮箱查找用户（一次查询，用户名优先）
+    2. 验证密码（用户不存在时验证占位哈希，响应时间一致）
+    3. 检查账户是否激活
+    4. 生成并返回 JWT 令牌
 
     Args:
         form_data: OAuth2 登录表单（username 和 password）
@@ -116,13 +112,16 @@ async def login(
     Note:
         username 字段可以填写用户名或邮箱。
     """
-    # 尝试通过用户名或邮箱查找用户
-    user = await user_crud.get_user_by_username(db, username=form_data.username)
-    if not user:
-        user = await user_crud.get_user_by_email(db, email=form_data.username)
+    # 一次查询通过用户名或邮箱查找用户
+    user = await user_crud.get_user_by_username_or_email(db, form_data.username)
 
     # 验证密码
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # 用户不存在时对占位哈希执行验证，保证每次登录都恰好执行一次哈希计算
+    password_ok = await averify_password(
+        form_data.password,
+        user.hashed_password if user else DUMMY_PASSWORD_HASH
+    )
+    if user is None or not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -17,39 +17,63 @@ API 端点
 
 - 所有端点都需要用户认证
 - 用户只能访问自己创建的投资组合
+
+缓存说明
+--------
+
+启用 RESPONSE_CACHE_TTL 后，投资组合列表按用户缓存（命名空间 portfolios:{user_id}），
+创建、更新、删除投资组合后立即失效。
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
+from app import cache
 from app.database import get_db
-from app.schemas.portfolio import Portfolio, PortfolioCreate, PortfolioUpdate
-from app.crud import portfolio as portfolio_crud
-from app.auth.dependencies import get_current_active_user
-from app.models import User
+from app.schemas.portfolio import Portfolio, PortfolioCreate, PortfolioUpdate, portfolio_list_adapter
+from app.crud import has_changes, portfolio as portfolio_crud
+from app.auth.dependencies import get_current_active_user, owned_portfolio
+from app.models import User, Portfolio as PortfolioModel
 
 # 创建路由器
 router = APIRouter(prefix="/portfolios", tags=["portfolios"])
 
 
-@router.get("", response_model=List[Portfolio])
+@router.get("", response_model=None, responses={200: {"model": List[Portfolio]}})
 async def get_my_portfolios(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_id: Optional[int] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """获取当前用户的所有投资组合
 
-    返回当前登录用户创建的所有投资组合列表。
+    返回当前登录用户创建的所有投资组合列表，按 ID 升序排列，支持游标分页。
 
     Args:
+        limit: 每页最大记录数（可选，不传则返回全部）
+        after_id: 分页游标，传入上一页最后一个投资组合的 ID（可选）
         db: 数据库会话
         current_user: 当前登录用户
 
     Returns:
-        List[Portfolio]: 投资组合列表
+        Response: 投资组合列表的 JSON 响应
+
+    Note:
+        列表由 portfolio_list_adapter 一次完成校验和 JSON 编码，缓存中保存的也是编码后的响应体。
     """
-    portfolios = await portfolio_crud.get_user_portfolios(db, user_id=current_user.id)
-    return portfolios
+    namespace = f"portfolios:{current_user.id}"
+    version = cache.current_version(namespace)
+    body = cache.get_cached(namespace, version, (limit, after_id))
+    if body is cache.MISS:
+        portfolios = await portfolio_crud.get_user_portfolios(
+            db, user_id=current_user.id, limit=limit, after_id=after_id
+        )
+        body = portfolio_list_adapter.dump_json(
+            portfolio_list_adapter.validate_python(portfolios, from_attributes=True)
+        )
+        cache.set_cached(namespace, version, (limit, after_id), body)
+    return Response(content=body, media_type="application/json")
 
 
 @router.post("", response_model=Portfolio, status_code=status.HTTP_201_CREATED)
@@ -70,23 +94,21 @@ async def create_portfolio(
     Returns:
         Portfolio: 创建的投资组合信息
     """
-    return await portfolio_crud.create_portfolio(db, portfolio=portfolio, user_id=current_user.id)
+    db_portfolio = await portfolio_crud.create_portfolio(db, portfolio=portfolio, user_id=current_user.id)
+    cache.invalidate(f"portfolios:{current_user.id}")
+    return db_portfolio
 
 
 @router.get("/{portfolio_id}", response_model=Portfolio)
 async def get_portfolio(
-    portfolio_id: int,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    portfolio: PortfolioModel = Depends(owned_portfolio("access"))
 ):
     """获取指定投资组合
 
     根据 ID 获取投资组合详情。用户只能访问自己的投资组合。
 
     Args:
-        portfolio_id: 投资组合 ID
-        db: 数据库会话
-        current_user: 当前登录用户
+        portfolio: 已验证所有权的投资组合（由 owned_portfolio 根据路径参数 portfolio_id 注入）
 
     Returns:
         Portfolio: 投资组合信息
@@ -95,20 +117,6 @@ async def get_portfolio(
         HTTPException: 404 - 投资组合不存在
         HTTPException: 403 - 无权访问该投资组合
     """
-    portfolio = await portfolio_crud.get_portfolio_by_id(db, portfolio_id=portfolio_id)
-    if not portfolio:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Portfolio not found"
-        )
-
-    # 验证用户是否拥有该投资组合
-    if portfolio.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this portfolio"
-        )
-
     return portfolio
 
 
@@ -116,6 +124,7 @@ async def get_portfolio(
 async def update_portfolio(
     portfolio_id: int,
     portfolio_update: PortfolioUpdate,
+    portfolio: PortfolioModel = Depends(owned_portfolio("modify")),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -126,6 +135,7 @@ async def update_portfolio(
     Args:
         portfolio_id: 投资组合 ID
         portfolio_update: 更新数据
+        portfolio: 已验证所有权的投资组合
         db: 数据库会话
         current_user: 当前登录用户
 
@@ -136,29 +146,21 @@ async def update_portfolio(
         HTTPException: 404 - 投资组合不存在
         HTTPException: 403 - 无权修改该投资组合
     """
-    portfolio = await portfolio_crud.get_portfolio_by_id(db, portfolio_id=portfolio_id)
-    if not portfolio:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Portfolio not found"
-        )
-
-    # 验证用户是否拥有该投资组合
-    if portfolio.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to modify this portfolio"
-        )
+    # 空请求或值未变化时直接返回已加载的投资组合，不执行 UPDATE
+    if not has_changes(portfolio, portfolio_update):
+        return portfolio
 
     updated_portfolio = await portfolio_crud.update_portfolio(
         db, portfolio_id=portfolio_id, portfolio_update=portfolio_update
     )
+    cache.invalidate(f"portfolios:{current_user.id}")
     return updated_portfolio
 
 
 @router.delete("/{portfolio_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_portfolio(
     portfolio_id: int,
+    portfolio: PortfolioModel = Depends(owned_portfolio("delete")),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -168,6 +170,7 @@ async def delete_portfolio(
 
     Args:
         portfolio_id: 投资组合 ID
+        portfolio: 已验证所有权的投资组合
         db: 数据库会话
         current_user: 当前登录用户
 
@@ -181,19 +184,7 @@ async def delete_portfolio(
     Note:
         删除投资组合会级联删除该组合下的所有交易记录。
     """
-    portfolio = await portfolio_crud.get_portfolio_by_id(db, portfolio_id=portfolio_id)
-    if not portfolio:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Portfolio not found"
-        )
-
-    # 验证用户是否拥有该投资组合
-    if portfolio.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to delete this portfolio"
-        )
-
     await portfolio_crud.delete_portfolio(db, portfolio_id=portfolio_id)
+    cache.invalidate(f"portfolios:{current_user.id}")
+    cache.invalidate(f"trades:{portfolio_id}")
     return None
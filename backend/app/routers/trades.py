@@ -21,21 +21,35 @@ API 端点
 - 所有端点都需要用户认证
 - 用户只能操作自己投资组合中的交易
 - 通过投资组合所有权验证来确保权限
+- 单笔交易的操作通过一次 JOIN 查询同时取回交易和投资组合所有者
+
+缓存说明
+--------
+
+启用 RESPONSE_CACHE_TTL 后，交易列表按投资组合和用户缓存（命名空间 trades:{portfolio_id}），
+交易的创建、更新、平仓、上传截图和删除都会使对应投资组合的缓存失效。
+只缓存通过所有权校验的结果，键中包含用户 ID。
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import shutil
+import aiofiles
+import aiofiles.os
+import secrets
 from datetime import datetime
+from app import cache
 from app.database import get_db
-from app.schemas.trade import Trade, TradeCreate, TradeUpdate, TradeClose
+from app.schemas.trade import (
+    SCREENSHOT_URL_PREFIX, Trade, TradeCreate, TradeUpdate, TradeClose, trade_list_adapter
+)
 from app.models.trade import TradeStatus
-from app.crud import trade as trade_crud
+from app.crud import has_changes, trade as trade_crud
 from app.crud import portfolio as portfolio_crud
 from app.auth.dependencies import get_current_active_user
-from app.models import User
+from app.models import User, Trade as TradeModel
 
 # 创建路由器
 router = APIRouter(prefix="/trades", tags=["trades"])
@@ -45,6 +59,44 @@ router = APIRouter(prefix="/trades", tags=["trades"])
 UPLOAD_DIR = Path("uploads/screenshots")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# 上传文件分块写入的块大小（1 MiB）
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# 允许的截图 Content-Type
+ALLOWED_IMAGE_TYPES = frozenset({"image/jpeg", "image/png", "image/jpg", "image/webp"})
+
+# 允许的截图文件扩展名
+ALLOWED_IMAGE_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png", ".webp"})
+
+# 截图文件大小上限（10 MiB）
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
+# 截图上传请求体大小上限，由 UploadSizeLimitMiddleware 在读取请求体前检查
+# 在文件大小上限之外为 multipart 边界和各部分的头部预留 64 KiB
+MAX_UPLOAD_REQUEST_SIZE = MAX_UPLOAD_SIZE + 64 * 1024
+
+
+def _is_image_header(header: bytes) -> bool:
+    """根据文件头（前 12 字节）判断是否为 JPEG、PNG 或 WebP 图片
+
+    Args:
+        header: 文件开头的字节
+
+    Returns:
+        bool: 文件头与支持的图片格式签名匹配返回 True
+    """
+    return (
+        header.startswith(b"\xff\xd8\xff")  # JPEG
+        or header.startswith(b"\x89PNG\r\n\x1a\n")  # PNG
+        or (header[:4] == b"RIFF" and header[8:12] == b"WEBP")  # WebP
+    )
+
+
+# 截图写盘使用的专用线程池
+# aiofiles 在线程池中执行实际的文件 IO，这里限制同时写盘的线程数，
+# 避免大量并发上传占满默认线程池（其他 to_thread 调用如密码哈希也依赖它）
+UPLOAD_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="upload")
+
 
 async def verify_portfolio_ownership(portfolio_id: int, user_id: int, db: AsyncSession):
     """验证用户对投资组合的所有权
@@ -56,50 +108,116 @@ async def verify_portfolio_ownership(portfolio_id: int, user_id: int, db: AsyncS
         user_id: 当前用户 ID
         db: 数据库会话
 
-    Returns:
-        Portfolio: 投资组合对象
-
     Raises:
         HTTPException: 404 - 投资组合不存在
         HTTPException: 403 - 用户无权访问该投资组合
     """
-    portfolio = await portfolio_crud.get_portfolio_by_id(db, portfolio_id=portfolio_id)
-    if not portfolio:
+    # 只查询所有者 ID，不加载整行投资组合
+    owner_id = await portfolio_crud.get_portfolio_owner_id(db, portfolio_id=portfolio_id)
+    if owner_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Portfolio not found"
         )
-    if portfolio.user_id != user_id:
+    if owner_id != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this portfolio"
         )
-    return portfolio
 
 
-@router.get("/portfolio/{portfolio_id}", response_model=List[Trade])
+async def _authorize_trade(trade_id: int, user_id: int, db: AsyncSession) -> TradeModel:
+    """获取交易并验证用户对其投资组合的所有权
+
+    交易与投资组合所有者 ID 在同一条 JOIN 查询中取回，只需一次数据库往返。
+
+    Args:
+        trade_id: 交易 ID
+        user_id: 当前用户 ID
+        db: 数据库会话
+
+    Returns:
+        Trade: 交易记录对象
+
+    Raises:
+        HTTPException: 404 - 交易不存在
+        HTTPException: 403 - 用户无权访问该投资组合
+    """
+    row = await trade_crud.get_trade_with_owner_id(db, trade_id=trade_id)
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trade not found"
+        )
+    trade, owner_id = row
+    if owner_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this portfolio"
+        )
+    return trade
+
+
+@router.get("/portfolio/{portfolio_id}", response_model=None, responses={200: {"model": List[Trade]}})
 async def get_portfolio_trades(
     portfolio_id: int,
     status: Optional[TradeStatus] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[datetime] = None,
+    after_id: Optional[int] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """获取投资组合的交易列表
 
-    获取指定投资组合中的所有交易记录，支持按状态筛选。
+    获取指定投资组合中的所有交易记录，支持按状态筛选和游标分页。
 
     Args:
         portfolio_id: 投资组合 ID
         status: 交易状态筛选（可选，open=持仓中, closed=已平仓）
+        limit: 每页最大记录数（可选，不传则返回全部）
+        after: 分页游标，传入上一页最后一条交易的 entry_date（可选）
+        after_id: 分页游标，传入上一页最后一条交易的 id（可选，与 after 一起使用）
         db: 数据库会话
         current_user: 当前登录用户
 
     Returns:
-        List[Trade]: 交易记录列表，按入场时间降序排列
+        Response: 交易记录列表的 JSON 响应，按入场时间、ID 降序排列
+
+    Raises:
+        HTTPException: 404 - 投资组合不存在
+        HTTPException: 403 - 用户无权访问该投资组合
     """
-    await verify_portfolio_ownership(portfolio_id, current_user.id, db)
-    trades = await trade_crud.get_portfolio_trades(db, portfolio_id=portfolio_id, status=status)
-    return trades
+    namespace = f"trades:{portfolio_id}"
+    key = (current_user.id, status, limit, after, after_id)
+    version = cache.current_version(namespace)
+    body = cache.get_cached(namespace, version, key)
+    if body is not cache.MISS:
+        return Response(content=body, media_type="application/json")
+
+    # 路由参数 status 与 fastapi.status 同名，这里直接使用数字状态码
+    # 一次 JOIN 查询同时完成所有权校验和交易查询
+    exists, owned, trades = await trade_crud.list_trades_for_user_portfolio(
+        db, portfolio_id=portfolio_id, user_id=current_user.id,
+        status=status, limit=limit, after=after, after_id=after_id
+    )
+    if not exists:
+        raise HTTPException(
+            status_code=404,
+            detail="Portfolio not found"
+        )
+    if not owned:
+        raise HTTPException(
+            status_code=403,
+            detail="Not authorized to access this portfolio"
+        )
+
+    # 由 trade_list_adapter 一次完成校验和 JSON 编码，缓存中保存编码后的响应体
+    body = trade_list_adapter.dump_json(
+        trade_list_adapter.validate_python(trades, from_attributes=True)
+    )
+    cache.set_cached(namespace, version, key, body)
+    return Response(content=body, media_type="application/json")
 
 
 @router.post("/", response_model=Trade, status_code=status.HTTP_201_CREATED)
@@ -122,7 +240,9 @@ async def create_trade(
         Trade: 创建的交易记录
     """
     await verify_portfolio_ownership(trade.portfolio_id, current_user.id, db)
-    return await trade_crud.create_trade(db, trade=trade)
+    db_trade = await trade_crud.create_trade(db, trade=trade)
+    cache.invalidate(f"trades:{trade.portfolio_id}")
+    return db_trade
 
 
 @router.get("/{trade_id}", response_model=Trade)
@@ -146,16 +266,8 @@ async def get_trade(
     Raises:
         HTTPException: 404 - 交易不存在
     """
-    trade = await trade_crud.get_trade_by_id(db, trade_id=trade_id)
-    if not trade:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Trade not found"
-        )
-
-    # 通过投资组合验证所有权
-    await verify_portfolio_ownership(trade.portfolio_id, current_user.id, db)
-    return trade
+    # 获取交易并通过投资组合验证所有权
+    return await _authorize_trade(trade_id, current_user.id, db)
 
 
 @router.patch("/{trade_id}", response_model=Trade)
@@ -181,17 +293,15 @@ async def update_trade(
     Raises:
         HTTPException: 404 - 交易不存在
     """
-    trade = await trade_crud.get_trade_by_id(db, trade_id=trade_id)
-    if not trade:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Trade not found"
-        )
+    # 获取交易并通过投资组合验证所有权
+    trade = await _authorize_trade(trade_id, current_user.id, db)
 
-    # 通过投资组合验证所有权
-    await verify_portfolio_ownership(trade.portfolio_id, current_user.id, db)
+    # 空请求或值未变化时直接返回已加载的交易，不执行 UPDATE
+    if not has_changes(trade, trade_update):
+        return trade
 
     updated_trade = await trade_crud.update_trade(db, trade_id=trade_id, trade_update=trade_update)
+    cache.invalidate(f"trades:{trade.portfolio_id}")
     return updated_trade
 
 
@@ -224,16 +334,15 @@ async def close_trade(
     Raises:
         HTTPException: 404 - 交易不存在
         HTTPException: 400 - 交易已经平仓
-    """
-    trade = await trade_crud.get_trade_by_id(db, trade_id=trade_id)
-    if not trade:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Trade not found"
-        )
 
-    # 通过投资组合验证所有权
-    await verify_portfolio_ownership(trade.portfolio_id, current_user.id, db)
+    Note:
+        交易和投资组合所有者由一条 JOIN 查询取回，平仓由一条 UPDATE ... RETURNING 完成，
+        共两次数据库往返。没有把交易查询和所有权查询拆成两个并发任务：
+        同一个 AsyncSession 不允许并发执行查询，改用两个会话又会多占用一个连接，
+        而单条 JOIN 本身就只需一次往返。
+    """
+    # 获取交易并通过投资组合验证所有权
+    trade = await _authorize_trade(trade_id, current_user.id, db)
 
     # 检查交易是否已经平仓
     if trade.status == TradeStatus.CLOSED:
@@ -243,6 +352,7 @@ async def close_trade(
         )
 
     closed_trade = await trade_crud.close_trade(db, trade_id=trade_id, trade_close=trade_close)
+    cache.invalidate(f"trades:{trade.portfolio_id}")
     return closed_trade
 
 
@@ -264,49 +374,79 @@ async def upload_screenshot(
         current_user: 当前登录用户
 
     Returns:
-        dict: 包含文件名和保存路径的字典
+        dict: 包含文件名和访问 URL 的字典
 
     Raises:
         HTTPException: 404 - 交易不存在
-        HTTPException: 400 - 文件类型不支持
+        HTTPException: 400 - 文件类型或扩展名不支持
+        HTTPException: 413 - 文件超过大小上限
 
     Note:
-        支持的图片格式：JPEG、PNG、WebP
+        支持的图片格式：JPEG、PNG、WebP，最大 10 MiB。
+        除 Content-Type 外还会校验文件头签名，校验通过后才写入磁盘。
+        超大的请求体在解析之前已由 UploadSizeLimitMiddleware 拒绝，
+        写入时按实际字节数再限制一次。
     """
-    trade = await trade_crud.get_trade_by_id(db, trade_id=trade_id)
-    if not trade:
+    # 获取交易并通过投资组合验证所有权
+    trade = await _authorize_trade(trade_id, current_user.id, db)
+
+    # 验证文件类型
+    if file.content_type not in ALLOWED_IMAGE_TYPES:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Trade not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only image files (JPEG, PNG, WebP) are allowed"
         )
 
-    # 通过投资组合验证所有权
-    await verify_portfolio_ownership(trade.portfolio_id, current_user.id, db)
+    # 请求体上限包含 multipart 开销，这里按文件本身的大小再检查一次
+    if file.size is not None and file.size > MAX_UPLOAD_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="File too large (max 10 MiB)"
+        )
 
-    # 验证文件类型
-    allowed_types = ["image/jpeg", "image/png", "image/jpg", "image/webp"]
-    if file.content_type not in allowed_types:
+    # 校验文件头签名，Content-Type 由客户端声明，不能单独作为依据
+    header = await file.read(12)
+    if not _is_image_header(header):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only image files (JPEG, PNG, WebP) are allowed"
+        )
+
+    # 扩展名只允许白名单中的值，防止通过构造的 file.filename 写出其他类型或路径
+    file_extension = Path(file.filename or "").suffix.lower()
+    if file_extension not in ALLOWED_IMAGE_EXTENSIONS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Only image files (JPEG, PNG, WebP) are allowed"
         )
 
-    # 创建唯一文件名（包含交易 ID 和时间戳）
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_extension = Path(file.filename).suffix
-    filename = f"trade_{trade_id}_{timestamp}{file_extension}"
+    # 创建唯一文件名（交易 ID + 随机串），同一秒内的并发上传也不会重名
+    filename = f"trade_{trade_id}_{secrets.token_hex(6)}{file_extension}"
     file_path = UPLOAD_DIR / filename
 
     # 保存文件
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # 分块异步写入，磁盘 IO 期间事件循环可以继续处理其他请求
+    # 已读取的文件头先写入，再继续读取剩余内容；累计大小超过上限时删除已写入的部分
+    written = len(header)
+    async with aiofiles.open(file_path, "wb", executor=UPLOAD_EXECUTOR) as buffer:
+        await buffer.write(header)
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            written += len(chunk)
+            if written > MAX_UPLOAD_SIZE:
+                break
+            await buffer.write(chunk)
+    if written > MAX_UPLOAD_SIZE:
+        await aiofiles.os.remove(file_path, executor=UPLOAD_EXECUTOR)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="File too large (max 10 MiB)"
+        )
 
-    # 更新交易的截图路径
-    from app.schemas.trade import TradeUpdate
-    trade_update = TradeUpdate(screenshot_path=str(file_path))
-    await trade_crud.update_trade(db, trade_id=trade_id, trade_update=trade_update)
+    # 数据库只保存文件名，访问地址由 SCREENSHOT_URL_PREFIX 拼接
+    await trade_crud.set_screenshot_path(db, trade_id=trade_id, path=filename)
+    cache.invalidate(f"trades:{trade.portfolio_id}")
 
-    return {"filename": filename, "path": str(file_path)}
+    return {"filename": filename, "path": f"{SCREENSHOT_URL_PREFIX}/{filename}"}
 
 
 @router.delete("/{trade_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -330,15 +470,9 @@ async def delete_trade(
     Raises:
         HTTPException: 404 - 交易不存在
     """
-    trade = await trade_crud.get_trade_by_id(db, trade_id=trade_id)
-    if not trade:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Trade not found"
-        )
-
-    # 通过投资组合验证所有权
-    await verify_portfolio_ownership(trade.portfolio_id, current_user.id, db)
+    # 获取交易并通过投资组合验证所有权
+    trade = await _authorize_trade(trade_id, current_user.id, db)
 
     await trade_crud.delete_trade(db, trade_id=trade_id)
+    cache.invalidate(f"trades:{trade.portfolio_id}")
     return None
@@ -21,11 +21,11 @@ API 端点
 - 删除其他用户（不能删除自己）
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from app.database import get_db
-from app.schemas.user import User, UserUpdate
+from app.schemas.user import User, UserUpdate, user_list_adapter
 from app.crud import user as user_crud
 from app.auth.dependencies import get_current_admin_user
 from app.models import User as UserModel
@@ -34,28 +34,35 @@ from app.models import User as UserModel
 router = APIRouter(prefix="/users", tags=["users"])
 
 
-@router.get("", response_model=List[User])
+@router.get("", response_model=None, responses={200: {"model": List[User]}})
 async def get_all_users(
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    after_id: Optional[int] = None,
     db: AsyncSession = Depends(get_db),
     current_user: UserModel = Depends(get_current_admin_user)
 ):
     """获取所有用户列表（仅管理员）
 
-    分页获取系统中的所有用户。
+    分页获取系统中的所有用户，按 ID 升序排列。
+    下一页传入上一页最后一个用户的 ID 作为 after_id（游标分页），无需 OFFSET。
 
     Args:
-        skip: 跳过的记录数（用于分页）
+        skip: 跳过的记录数（旧的分页方式，传入 after_id 时忽略）
         limit: 返回的最大记录数
+        after_id: 分页游标，传入上一页最后一个用户的 ID（可选）
         db: 数据库会话
         current_user: 当前管理员用户
 
     Returns:
-        List[User]: 用户列表
+        Response: 用户列表的 JSON 响应
+
+    Note:
+        列表由 user_list_adapter 一次完成校验和 JSON 编码。
     """
-    users = await user_crud.get_users(db, skip=skip, limit=limit)
-    return users
+    users = await user_crud.get_users(db, skip=skip, limit=limit, after_id=after_id)
+    body = user_list_adapter.dump_json(user_list_adapter.validate_python(users, from_attributes=True))
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/{user_id}", response_model=User)
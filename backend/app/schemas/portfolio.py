@@ -12,8 +12,8 @@
 - **Portfolio**: API 响应模式
 """
 
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, TypeAdapter
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -74,3 +74,8 @@ class Portfolio(PortfolioBase):
     class Config:
         """Pydantic 配置"""
         from_attributes = True  # 允许从 ORM 模型创建
+
+
+# 投资组合列表的 TypeAdapter（模块加载时构建一次）
+# 列表端点直接用它完成校验和 JSON 编码，跳过 FastAPI 的逐项序列化与 jsonable_encoder
+portfolio_list_adapter = TypeAdapter(List[Portfolio])
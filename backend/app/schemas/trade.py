@@ -13,11 +13,15 @@
 - **Trade**: API 响应模式
 """
 
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, TypeAdapter, computed_field
+from typing import List, Optional
 from datetime import datetime
 from app.models.trade import TradeType, TradeStatus
 
+# 截图文件的访问 URL 前缀
+# 生产环境由 nginx 的 /uploads/ 直接提供文件（sendfile），请求不经过 FastAPI
+SCREENSHOT_URL_PREFIX = "/uploads/screenshots"
+
 
 class TradeBase(BaseModel):
     """交易基础模式
@@ -111,7 +115,8 @@ class Trade(TradeBase):
         exit_date: 出场日期（平仓后有值）
         profit_loss: 盈亏金额（INR，平仓后计算）
         profit_loss_percentage: 盈亏百分比（平仓后计算）
-        screenshot_path: 交易截图路径
+        screenshot_path: 交易截图文件名
+        screenshot_url: 交易截图访问 URL（由文件名生成）
         created_at: 记录创建时间
         updated_at: 记录更新时间
     """
@@ -126,6 +131,23 @@ class Trade(TradeBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
+    @computed_field
+    @property
+    def screenshot_url(self) -> Optional[str]:
+        """截图访问 URL
+
+        数据库只保存文件名，访问地址在序列化时拼接。
+        兼容旧数据中保存的 uploads/screenshots/... 相对路径。
+        """
+        if not self.screenshot_path:
+            return None
+        return f"{SCREENSHOT_URL_PREFIX}/{self.screenshot_path.rpartition('/')[2]}"
+
     class Config:
         """Pydantic 配置"""
         from_attributes = True  # 允许从 ORM 模型创建
+
+
+# 交易列表的 TypeAdapter（模块加载时构建一次）
+# 列表端点直接用它完成校验和 JSON 编码，跳过 FastAPI 的逐项序列化与 jsonable_encoder
+trade_list_adapter = TypeAdapter(List[Trade])
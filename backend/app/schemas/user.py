@@ -7,24 +7,26 @@
 模式类说明
 ----------
 
-- **UserBase**: 用户基础模式，定义通用字段
+- **UserBase**: 用户基础模式，定义通用字段（请求侧，校验邮箱格式）
 - **UserCreate**: 用户注册请求模式
 - **UserUpdate**: 用户更新请求模式（所有字段可选）
+- **UserOut**: 响应侧基础模式（邮箱为普通字符串）
 - **UserInDB**: 数据库用户模式（包含完整字段）
 - **User**: API 响应模式
 - **Token**: JWT 令牌响应模式
 - **TokenData**: 令牌载荷数据模式
 """
 
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, TypeAdapter
+from typing import List, Optional
 from datetime import datetime
 
 
 class UserBase(BaseModel):
     """用户基础模式
 
-    定义用户的通用字段，作为其他用户模式的基类。
+    定义用户的通用字段，作为请求模式的基类。
+    邮箱使用 EmailStr 校验格式，仅用于客户端输入。
 
     Attributes:
         email: 用户邮箱地址
@@ -67,7 +69,23 @@ class UserUpdate(BaseModel):
     is_admin: Optional[bool] = None
 
 
-class UserInDB(UserBase):
+class UserOut(BaseModel):
+    """用户响应基础模式
+
+    字段与 UserBase 相同，但邮箱为普通字符串：
+    数据库中的邮箱在写入时已经校验过，序列化响应时不再重复执行 email-validator 的解析。
+
+    Attributes:
+        email: 用户邮箱地址
+        username: 用户名
+        full_name: 用户全名（可选）
+    """
+    email: str
+    username: str
+    full_name: Optional[str] = None
+
+
+class UserInDB(UserOut):
     """数据库用户模式
 
     包含数据库中存储的完整用户信息（不含密码）。
@@ -98,6 +116,11 @@ class User(UserInDB):
     pass
 
 
+# 用户列表的 TypeAdapter（模块加载时构建一次）
+# 列表端点直接用它完成校验和 JSON 编码，跳过 FastAPI 的逐项序列化与 jsonable_encoder
+user_list_adapter = TypeAdapter(List[User])
+
+
 class Token(BaseModel):
     """JWT 令牌响应模式
 
@@ -1,16 +1,30 @@
 """
 应用启动脚本
 
-本脚本用于在开发环境中启动 FastAPI 应用服务器。
+本脚本用于启动 FastAPI 应用服务器。
 
 使用方式
 --------
 
-直接运行此脚本启动开发服务器::
+直接运行此脚本启动服务::
 
     python run.py
 
-服务将在 http://0.0.0.0:8000 启动，支持热重载。
+开发环境设置 DEV=1 启用热重载::
+
+    DEV=1 python run.py
+
+服务将在 http://0.0.0.0:8000 启动。
+
+环境变量
+--------
+
+- **DEV**: 设为 1 时启用热重载（开发模式），此时只启动一个进程
+- **WEB_CONCURRENCY**: worker 进程数，默认 1（DEV=1 时忽略）
+
+事件循环与 HTTP 解析器使用 uvicorn 的 auto 模式：安装了 uvloop 和 httptools
+时自动使用（requirements.txt 中已包含），否则回退为 asyncio 和 h11。
+uvloop 不支持 Windows，在 Windows 上会自动使用 asyncio。
 
 生产部署
 --------
@@ -19,24 +33,40 @@
 
     uvicorn app.main:app --host 0.0.0.0 --port 8000
 
+数据库连接池
+------------
+
+每个 worker 进程在导入 app.database 时创建一个引擎和连接池，请求只从池中
+借用连接，不会为每个请求新建连接。使用 ``--workers N``（或 WEB_CONCURRENCY=N）时连接总数上限为
+N × (DB_POOL_SIZE + DB_MAX_OVERFLOW)，需要保证不超过数据库的最大连接数。
+SQLite 不使用这两项配置。
+
 注意事项
 --------
 
-- 开发模式启用了 `reload=True`，文件变更会自动重启
-- 生产环境应禁用热重载以提高性能
+- 热重载会额外启动一个文件监视进程，每次重载都会重建连接池，只应在开发时开启
+- 热重载与多 worker 不能同时使用
 """
 
+import os
 import uvicorn
 
 if __name__ == "__main__":
+    dev = os.getenv("DEV") == "1"
+
     # 启动 Uvicorn ASGI 服务器
     # - app.main:app: 指向 FastAPI 应用实例
     # - host: 监听所有网络接口
     # - port: 服务端口
-    # - reload: 开发模式下启用热重载
+    # - reload: 仅在开发模式下启用热重载
+    # - workers: worker 进程数，每个进程各自持有一个数据库连接池
+    # - loop / http: 优先使用 uvloop 和 httptools
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        reload=dev,
+        workers=1 if dev else int(os.getenv("WEB_CONCURRENCY", "1")),
+        loop="auto",
+        http="auto"
     )
@@ -0,0 +1,99 @@
+"""
+测试公共夹具
+
+在导入应用之前把配置指向临时目录中的 SQLite 数据库；测试会话期间
+工作目录切换到该临时目录，上传的截图同样写入临时目录。整个测试会话共用一个 TestClient（即一次应用启动），
+各测试通过注册不同的用户相互隔离。
+"""
+
+import itertools
+import os
+import tempfile
+
+import pytest
+
+_tmp_dir = tempfile.mkdtemp()
+os.environ["SECRET_KEY"] = "test-secret"
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp_dir}/test.db"
+os.environ["CSRF_COOKIE_SECURE"] = "false"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from app.main import app  # noqa: E402
+
+_user_seq = itertools.count(1)
+
+
+class ApiClient:
+    """携带访问令牌并自动回传 CSRF 令牌的测试客户端"""
+
+    def __init__(self, client: TestClient):
+        self.client = client
+        self.token = None
+        self.csrf_token = None
+
+    def request(self, method: str, url: str, **kwargs):
+        headers = kwargs.pop("headers", {})
+        if self.csrf_token:
+            headers["X-CSRF-Token"] = self.csrf_token
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        response = self.client.request(method, url, headers=headers, **kwargs)
+        if "X-CSRF-Token" in response.headers:
+            self.csrf_token = response.headers["X-CSRF-Token"]
+        return response
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url: str, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+
+def _register_and_login(client: TestClient, username: str) -> ApiClient:
+    """注册用户并登录，返回携带该用户令牌的客户端"""
+    api_client = ApiClient(client)
+    response = api_client.post(
+        "/api/auth/register",
+        json={"email": f"{username}@example.com", "username": username, "password": "pw"},
+    )
+    assert response.status_code == 201, response.text
+    response = api_client.post(
+        "/api/auth/login", data={"username": username, "password": "pw"}
+    )
+    assert response.status_code == 200, response.text
+    api_client.token = response.json()["access_token"]
+    return api_client
+
+
+@pytest.fixture(scope="session")
+def client():
+    cwd = os.getcwd()
+    os.chdir(_tmp_dir)
+    os.makedirs("uploads/screenshots", exist_ok=True)
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture(scope="session")
+def admin(client):
+    """管理员用户（数据库中第一个注册的用户自动成为管理员）"""
+    return _register_and_login(client, "admin")
+
+
+@pytest.fixture
+def api(client, admin):
+    """已注册并登录的新用户"""
+    return _register_and_login(client, f"user{next(_user_seq)}")
+
+
+@pytest.fixture
+def portfolio_id(api):
+    response = api.post("/api/portfolios", json={"name": "P", "initial_balance": 1000})
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
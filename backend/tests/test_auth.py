@@ -0,0 +1,66 @@
+"""
+认证依赖测试
+"""
+
+import asyncio
+
+from cachetools import TTLCache
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.auth import dependencies
+from app.auth.utils import create_access_token
+from app.config import get_settings
+from app.database import engine
+
+
+def test_authenticated_request_checks_out_one_connection(api, portfolio_id):
+    # 当前用户与端点查询共用 get_db 的同一个会话，每个请求只取出一次连接
+    checkouts = []
+
+    def on_checkout(*args):
+        checkouts.append(args)
+
+    event.listen(engine.sync_engine, "checkout", on_checkout)
+    try:
+        response = api.get(f"/api/portfolios/{portfolio_id}")
+    finally:
+        event.remove(engine.sync_engine, "checkout", on_checkout)
+
+    assert response.status_code == 200, response.text
+    assert len(checkouts) == 1
+
+
+def test_invalid_token_is_rejected(client):
+    response = client.get("/api/auth/me", headers={"Authorization": "Bearer garbage"})
+    assert response.status_code == 401
+
+
+def test_user_cache_skips_fill_after_concurrent_invalidation(admin, monkeypatch):
+    user_id = admin.get("/api/auth/me").json()["id"]
+    token = create_access_token({"sub": str(user_id)})
+    cache = TTLCache(maxsize=10, ttl=60)
+    monkeypatch.setattr(dependencies, "_user_cache", cache)
+
+    async def resolve(invalidate_during_query: bool):
+        # 独立的引擎，避免与 TestClient 事件循环中的连接池混用
+        test_engine = create_async_engine(get_settings().DATABASE_URL)
+        sessionmaker = async_sessionmaker(test_engine, expire_on_commit=False)
+
+        def on_execute(orm_execute_state):
+            # 模拟查询进行期间管理员修改了该用户
+            dependencies.invalidate_user(user_id)
+
+        try:
+            async with sessionmaker() as db:
+                if invalidate_during_query:
+                    event.listen(db.sync_session, "do_orm_execute", on_execute)
+                return await dependencies.resolve_user(token, db)
+        finally:
+            await test_engine.dispose()
+
+    assert asyncio.run(resolve(invalidate_during_query=True)).id == user_id
+    assert user_id not in cache
+
+    assert asyncio.run(resolve(invalidate_during_query=False)).id == user_id
+    assert user_id in cache
@@ -0,0 +1,63 @@
+"""
+列表查询缓存测试
+
+测试环境默认禁用缓存（RESPONSE_CACHE_TTL=0），这里直接为模块装上缓存实例。
+"""
+
+import pytest
+from cachetools import TTLCache
+
+from app import cache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def timer(monkeypatch):
+    timer = FakeTimer()
+    monkeypatch.setattr(cache, "_cache", TTLCache(maxsize=100, ttl=10, timer=timer))
+    monkeypatch.setattr(cache, "_versions", cache._VersionCache(maxsize=2, ttl=10, timer=timer))
+    monkeypatch.setattr(cache, "_base_version", 0)
+    return timer
+
+
+def test_invalidate_hides_existing_entries(timer):
+    version = cache.current_version("trades:1")
+    cache.set_cached("trades:1", version, "k", b"old")
+    assert cache.get_cached("trades:1", version, "k") == b"old"
+
+    cache.invalidate("trades:1")
+    assert cache.get_cached("trades:1", cache.current_version("trades:1"), "k") is cache.MISS
+
+
+def test_result_fetched_before_invalidation_is_not_stored(timer):
+    # 读取版本号 → 查询数据库期间发生失效 → 写入时必须丢弃旧结果
+    version = cache.current_version("trades:1")
+    cache.invalidate("trades:1")
+    cache.set_cached("trades:1", version, "k", b"stale")
+
+    assert cache.get_cached("trades:1", cache.current_version("trades:1"), "k") is cache.MISS
+    assert cache.get_cached("trades:1", version, "k") is cache.MISS
+
+
+def test_versions_are_bounded(timer):
+    for n in range(10):
+        cache.invalidate(f"trades:{n}")
+    assert len(cache._versions) <= 2
+
+    # 版本记录被淘汰后不会退回到更早的版本
+    cache.invalidate("trades:a")
+    evicted_version = cache.current_version("trades:a")
+    cache.invalidate("trades:b")
+    cache.invalidate("trades:c")
+    assert "trades:a" not in cache._versions
+    assert cache.current_version("trades:a") >= evicted_version
+
+    timer.now = 11
+    assert len(cache._versions) == 0
@@ -0,0 +1,52 @@
+"""
+索引与查询计划测试
+
+使用独立的同步 SQLite 连接检查交易列表查询能直接按索引顺序读取，
+以及 _upgrade_schema 会按模型重建旧版本的复合索引。
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.crud.trade import _portfolio_trades_query
+from app.database import Base, _upgrade_schema
+from app.models.trade import TradeStatus
+
+
+@pytest.fixture
+def sync_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/plan.db")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def _query_plan(engine, query) -> list:
+    sql = str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+@pytest.mark.parametrize("status", [None, TradeStatus.OPEN])
+@pytest.mark.parametrize("after, after_id", [(None, None), (datetime(2024, 1, 1), 5)])
+def test_trade_list_uses_index_order(sync_engine, status, after, after_id):
+    plan = _query_plan(sync_engine, _portfolio_trades_query(1, status, 10, after, after_id))
+    assert any("ix_trade_portfolio_entry" in step for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def test_upgrade_schema_rebuilds_outdated_index(sync_engine):
+    with sync_engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_trade_portfolio_entry")
+        conn.exec_driver_sql(
+            "CREATE INDEX ix_trade_portfolio_entry ON trades (portfolio_id, entry_date DESC)"
+        )
+        _upgrade_schema(conn)
+
+    indexes = {
+        index["name"]: index["column_names"]
+        for index in inspect(sync_engine).get_indexes("trades")
+    }
+    assert indexes["ix_trade_portfolio_entry"] == ["portfolio_id", "entry_date", "id"]
@@ -0,0 +1,98 @@
+"""
+交易接口测试
+"""
+
+import io
+
+from app.routers.trades import MAX_UPLOAD_REQUEST_SIZE
+
+
+def _create_trade(api, portfolio_id: int, entry_date: str = "2024-01-01T10:00:00", **fields) -> dict:
+    payload = {
+        "portfolio_id": portfolio_id, "symbol": "TCS", "trade_type": "long",
+        "entry_price": 100, "entry_date": entry_date, "quantity": 2,
+    }
+    payload.update(fields)
+    response = api.post("/api/trades/", json=payload)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_close_trade_returns_fresh_row(api, portfolio_id):
+    trade = _create_trade(api, portfolio_id)
+    assert trade["updated_at"] is None
+
+    response = api.post(
+        f"/api/trades/{trade['id']}/close",
+        json={"exit_price": 110, "exit_date": "2024-02-01T10:00:00"},
+    )
+    assert response.status_code == 200, response.text
+    closed = response.json()
+    assert closed["status"] == "closed"
+    assert closed["profit_loss"] == 20
+    assert closed["updated_at"] is not None
+    assert api.get(f"/api/trades/{trade['id']}").json()["updated_at"] == closed["updated_at"]
+
+
+def test_pagination_across_equal_entry_dates(api, portfolio_id):
+    # 五笔交易中有三笔入场时间相同，分页边界会落在这组交易中间
+    dates = [
+        "2024-01-03T10:00:00",
+        "2024-01-02T10:00:00",
+        "2024-01-02T10:00:00",
+        "2024-01-02T10:00:00",
+        "2024-01-01T10:00:00",
+    ]
+    ids = [_create_trade(api, portfolio_id, entry_date=d)["id"] for d in dates]
+    expected = [ids[0], ids[3], ids[2], ids[1], ids[4]]
+
+    url = f"/api/trades/portfolio/{portfolio_id}"
+    assert [t["id"] for t in api.get(url).json()] == expected
+
+    seen = []
+    params = {"limit": 2}
+    while True:
+        page = api.get(url, params=params).json()
+        if not page:
+            break
+        seen.extend(t["id"] for t in page)
+        last = page[-1]
+        params = {"limit": 2, "after": last["entry_date"], "after_id": last["id"]}
+    assert seen == expected
+
+
+def test_oversized_upload_rejected_before_body_is_read(api):
+    # 交易不存在：如果请求到达端点会返回 404，返回 413 说明在读取请求体之前就被拒绝
+    png = b"\x89PNG\r\n\x1a\n" + b"\0" * (MAX_UPLOAD_REQUEST_SIZE + 1)
+    response = api.post(
+        "/api/trades/999999/screenshot",
+        files={"file": ("a.png", io.BytesIO(png), "image/png")},
+    )
+    assert response.status_code == 413, response.text
+    assert response.json() == {"detail": "File too large (max 10 MiB)"}
+
+
+def test_oversized_chunked_upload_is_capped(api):
+    # 分块传输没有 Content-Length，由中间件按实际接收的字节数限制
+    def chunks():
+        for _ in range(12):
+            yield b"\0" * (1 << 20)
+
+    response = api.post(
+        "/api/trades/999999/screenshot",
+        content=chunks(),
+        headers={"Content-Type": "multipart/form-data; boundary=x"},
+    )
+    assert response.status_code == 413, response.text
+
+
+def test_upload_screenshot(api, portfolio_id):
+    trade = _create_trade(api, portfolio_id)
+    png = b"\x89PNG\r\n\x1a\n" + b"\0" * 100
+    response = api.post(
+        f"/api/trades/{trade['id']}/screenshot",
+        files={"file": ("a.png", io.BytesIO(png), "image/png")},
+    )
+    assert response.status_code == 200, response.text
+    filename = response.json()["filename"]
+    assert api.get(f"/api/trades/{trade['id']}").json()["screenshot_path"] == filename
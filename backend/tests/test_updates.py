@@ -0,0 +1,58 @@
+"""
+更新接口测试
+
+路由在更新前已为所有权校验加载过目标对象，响应中的 updated_at
+必须是 UPDATE 语句写入数据库的新值，而不是会话中旧实例的值。
+"""
+
+import time
+
+
+def _patch_twice(api, url: str, first: dict, second: dict):
+    """连续两次 PATCH，返回两次响应中的 updated_at
+
+    SQLite 的 CURRENT_TIMESTAMP 精度为秒，两次更新之间需间隔一秒以上。
+    """
+    response = api.patch(url, json=first)
+    assert response.status_code == 200, response.text
+    first_updated_at = response.json()["updated_at"]
+
+    time.sleep(1.1)
+    response = api.patch(url, json=second)
+    assert response.status_code == 200, response.text
+    return first_updated_at, response.json()["updated_at"]
+
+
+def test_update_portfolio_returns_fresh_updated_at(api, portfolio_id):
+    url = f"/api/portfolios/{portfolio_id}"
+    assert api.get(url).json()["updated_at"] is None
+
+    first, second = _patch_twice(api, url, {"name": "P2"}, {"name": "P3"})
+    assert first is not None
+    assert second is not None and second > first
+    assert api.get(url).json()["updated_at"] == second
+
+
+def test_update_trade_returns_fresh_updated_at(api, portfolio_id):
+    response = api.post("/api/trades/", json={
+        "portfolio_id": portfolio_id, "symbol": "TCS", "trade_type": "long",
+        "entry_price": 100, "entry_date": "2024-01-01T10:00:00", "quantity": 1,
+    })
+    assert response.status_code == 201, response.text
+    url = f"/api/trades/{response.json()['id']}"
+    assert response.json()["updated_at"] is None
+
+    first, second = _patch_twice(api, url, {"notes": "a"}, {"notes": "b"})
+    assert first is not None
+    assert second is not None and second > first
+    assert api.get(url).json()["updated_at"] == second
+
+
+def test_update_user_returns_fresh_updated_at(admin):
+    user = admin.get("/api/auth/me").json()
+    url = f"/api/users/{user['id']}"
+
+    first, second = _patch_twice(admin, url, {"full_name": "A"}, {"full_name": "B"})
+    assert first is not None
+    assert second is not None and second > first
+    assert admin.get(url).json()["updated_at"] == second